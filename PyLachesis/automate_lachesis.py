@@ -1,8 +1,51 @@
+import csv
 import glob
+import json
 import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from tqdm import tqdm
 from lachesis import Lachesis, LachesisMultiInstance
 
+# runs the single instance and the multi-instance simulation over every graph of a
+# directory, in a pool of worker processes (workers=0 runs them in this process),
+# and writes one result record per graph to a .jsonl or .csv results file
+# with cache=True, graphs whose result is current in the manifest of the output
+# directory (see result_cache.py) are not run again
+# with render_workers > 0 the PDFs are drawn by a RenderPool of that many processes
+# (see render_pool.py) while the graphs are run, render_workers=0 draws them in the
+# process running the graph
+# graph_format="svg" or "dot" writes the graphs without matplotlib (graph_writer.py)
+# dag_cache_dir keeps the parsed graphs as .ldag files in that directory (see
+# dag_cache.py), a run after the first one loads them instead of parsing the text
+
+RESULT_FIELDS = [
+    "graph",
+    "input_file",
+    "status",
+    "error",
+    "frame",
+    "block",
+    "frame_to_decide",
+    "atropos",
+    "cheaters",
+    "instances",
+    "instance_frames",
+    "single_seconds",
+    "multi_seconds",
+    "seconds",
+    "cached",
+]
+
+
+class GraphTimeout(Exception):
+    pass
+
+
+def raise_graph_timeout(signum, frame):
+    raise GraphTimeout()
+
 
 def create_dir(path):
     try:
@@ -11,51 +54,291 @@ def create_dir(path):
         pass
 
 
+def graph_name(input_filename):
+    base_filename = os.path.basename(input_filename)
+    return base_filename[base_filename.index("_") + 1 : base_filename.index(".txt")]
+
+
+def graph_dir(output_dir, input_filename):
+    return os.path.join(output_dir, f"graph_{graph_name(input_filename)}_results")
+
+
+def graph_outputs(record, output_dir, create_graph, create_graph_multi, graph_format):
+    outputs = []
+    if create_graph:
+        outputs.append(
+            os.path.join(
+                graph_dir(output_dir, record["input_file"]), f"result.{graph_format}"
+            )
+        )
+    if create_graph_multi:
+        for validator in record["instance_frames"] or {}:
+            outputs.append(
+                os.path.join(
+                    graph_dir(output_dir, record["input_file"]),
+                    f"validator_{validator}_result.{graph_format}",
+                )
+            )
+    return outputs
+
+
+def run_graph(
+    input_filename,
+    output_dir,
+    create_graph,
+    create_graph_multi,
+    timeout,
+    engine_options,
+    collect_render_jobs,
+    graph_format,
+    dag_cache_dir=None,
+):
+    # the record, and the render jobs of the graph if they are collected
+    if dag_cache_dir is not None:
+        import dag_cache
+
+        if dag_cache.default_dag_cache.cache_dir != dag_cache_dir:
+            dag_cache.configure_dag_cache(cache_dir=dag_cache_dir)
+    render_queue = None
+    if collect_render_jobs:
+        from render_pool import CollectedJobs
+
+        render_queue = CollectedJobs()
+    record = {field: None for field in RESULT_FIELDS}
+    record.update(
+        graph=graph_name(input_filename),
+        input_file=input_filename,
+        status="ok",
+        cached=False,
+    )
+
+    # the timeout is enforced with SIGALRM where there is one, it interrupts the
+    # graph in the process running it, which then moves on to the next one
+    alarm = timeout is not None and hasattr(signal, "SIGALRM")
+    if alarm:
+        signal.signal(signal.SIGALRM, raise_graph_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    start = time.perf_counter()
+    try:
+        results_dir = graph_dir(output_dir, input_filename)
+        if create_graph or create_graph_multi:
+            create_dir(results_dir)
+
+        output_filename = os.path.join(results_dir, f"result.{graph_format}")
+
+        lachesis_state = Lachesis(**engine_options)
+        lachesis_state.run_lachesis(
+            input_filename, output_filename, create_graph, render_queue
+        )
+        record["single_seconds"] = time.perf_counter() - start
+        record.update(
+            frame=lachesis_state.frame,
+            block=lachesis_state.block,
+            frame_to_decide=lachesis_state.frame_to_decide,
+            atropos=[
+                lachesis_state.get_event(atropos_id).uuid
+                for _, atropos_id in sorted(lachesis_state.atropos_roots.items())
+            ],
+            cheaters=sorted(lachesis_state.suspected_cheaters),
+        )
+
+        multi_start = time.perf_counter()
+        lachesis_multi_instance = LachesisMultiInstance(
+            graph_results=create_graph_multi, engine_options=engine_options
+        )
+        lachesis_multi_instance.run_lachesis_multiinstance(
+            input_filename,
+            results_dir,
+            graph_results=create_graph_multi,
+            render_queue=render_queue,
+            graph_format=graph_format,
+        )
+        record["multi_seconds"] = time.perf_counter() - multi_start
+        record.update(
+            instances=len(lachesis_multi_instance.instances),
+            instance_frames={
+                validator: instance.frame
+                for validator, instance in lachesis_multi_instance.instances.items()
+            },
+        )
+
+    except GraphTimeout:
+        record.update(status="timeout", error=f"timed out after {timeout}s")
+    except AssertionError as e:
+        record.update(status="assertion_failed", error=str(e))
+    except Exception as e:
+        record.update(status="error", error=f"{type(e).__name__}: {e}")
+    finally:
+        if alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    record["seconds"] = time.perf_counter() - start
+    return record, render_queue
+
+
+def run_graphs(input_filenames, *options):
+    return [run_graph(input_filename, *options) for input_filename in input_filenames]
+
+
+class ResultWriter:
+    # appends records to a .jsonl file, or to a .csv file with nested values as json
+    def __init__(self, results_path):
+        self.file = open(results_path, "w", newline="")
+        self.csv_writer = None
+        if results_path.endswith(".csv"):
+            self.csv_writer = csv.DictWriter(self.file, RESULT_FIELDS)
+            self.csv_writer.writeheader()
+
+    def write(self, record):
+        if self.csv_writer is None:
+            self.file.write(json.dumps(record) + "\n")
+        else:
+            self.csv_writer.writerow(
+                {
+                    field: (
+                        json.dumps(value) if isinstance(value, (list, dict)) else value
+                    )
+                    for field, value in record.items()
+                }
+            )
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
 def automate_lachesis(
-    input_dir, output_dir, create_graph=False, create_graph_multi=False
+    input_dir,
+    output_dir,
+    create_graph=False,
+    create_graph_multi=False,
+    workers=None,
+    timeout=None,
+    chunk_size=None,
+    results_path=None,
+    engine_options=None,
+    cache=True,
+    render_workers=1,
+    render_sample=1,
+    graph_format="pdf",
+    dag_cache_dir=None,
 ):
     input_graphs_directory = os.path.join(input_dir, "graph_*.txt")
-    file_list = glob.glob(input_graphs_directory)
+    file_list = sorted(glob.glob(input_graphs_directory))
+    engine_options = {} if engine_options is None else engine_options
 
-    print(f"processing {len(file_list)} files...")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if results_path is None:
+        results_path = os.path.join(output_dir, "results.jsonl")
+    create_dir(os.path.dirname(results_path) or ".")
 
     success_count = 0
+    result_writer = ResultWriter(results_path)
+    result_cache = None
+    run_list = file_list
+    if cache:
+        from result_cache import ResultCache
 
-    for _, input_filename in tqdm(
-        enumerate(file_list), total=len(file_list), desc="processing files"
-    ):
-        try:
-            base_filename = os.path.basename(input_filename)
-            graph_name = base_filename[
-                base_filename.index("_") + 1 : base_filename.index(".txt")
-            ]
+        result_cache = ResultCache(
+            output_dir,
+            {
+                "engine_options": engine_options,
+                "create_graph": create_graph,
+                "create_graph_multi": create_graph_multi,
+                "graph_format": graph_format,
+            },
+        )
+        run_list = []
+        for input_filename in file_list:
+            record = result_cache.lookup(input_filename)
+            if record is None:
+                run_list.append(input_filename)
+                continue
+            result_writer.write(dict(record, cached=True))
+            if record["status"] == "ok":
+                success_count += 1
+        print(f"results: {result_cache.summary()}")
 
-            graph_dir = os.path.join(output_dir, f"graph_{graph_name}_results")
-            if create_graph or create_graph_multi:
-                create_dir(graph_dir)
+    print(f"processing {len(run_list)} files with {workers} workers...")
 
-            output_filename = os.path.join(graph_dir, "result.pdf")
+    if chunk_size is None:
+        # a few chunks per worker, so a slow chunk does not hold the others back
+        chunk_size = max(1, len(run_list) // (max(workers, 1) * 4))
 
-            lachesis_state = Lachesis()
-            lachesis_state.run_lachesis(input_filename, output_filename, create_graph)
+    chunks = [run_list[i : i + chunk_size] for i in range(0, len(run_list), chunk_size)]
+    render_pool = None
+    if render_workers and (create_graph or create_graph_multi) and run_list:
+        from render_pool import RenderPool
 
-            lachesis_multi_instance = LachesisMultiInstance(
-                graph_results=create_graph_multi
-            )
-            lachesis_multi_instance.run_lachesis_multiinstance(
-                input_filename, graph_dir
-            )
+        render_pool = RenderPool(render_workers, sample=render_sample)
+    options = (
+        output_dir,
+        create_graph,
+        create_graph_multi,
+        timeout,
+        engine_options,
+        render_pool is not None,
+        graph_format,
+        dag_cache_dir,
+    )
+    progress = tqdm(total=len(run_list), desc="processing files")
+    executor = ProcessPoolExecutor(max_workers=workers) if workers else None
+    try:
+        if executor is None:
+            chunk_results = (run_graphs(chunk, *options) for chunk in chunks)
+        else:
+            futures = [executor.submit(run_graphs, chunk, *options) for chunk in chunks]
+            chunk_results = (future.result() for future in as_completed(futures))
 
-            success_count += 1
+        for records in chunk_results:
+            for record, render_jobs in records:
+                outputs = graph_outputs(
+                    record, output_dir, create_graph, create_graph_multi, graph_format
+                )
+                if render_jobs is not None:
+                    # the graphs skipped or not sampled by the render pool are not
+                    # expected outputs, the result stays current without them
+                    drawn = {
+                        job.output_filename
+                        for job in render_jobs
+                        if render_pool.put(job)
+                    }
+                    outputs = [output for output in outputs if output in drawn]
+                result_writer.write(record)
+                # a timeout may not repeat, everything else would
+                if result_cache is not None and record["status"] != "timeout":
+                    result_cache.store(record, outputs)
+                if record["status"] == "ok":
+                    success_count += 1
+                else:
+                    progress.write(
+                        f"{record['status']} in {record['graph']}: {record['error']}"
+                    )
+            progress.update(len(records))
+            if result_cache is not None:
+                result_cache.save()
+    finally:
+        progress.close()
+        result_writer.close()
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        if render_pool is not None:
+            render_pool.close()
 
-        except Exception as e:
-            print("error in", graph_name, str(e))
+    if render_pool is not None:
+        print(
+            f"rendered {render_pool.rendered} graphs, skipped {render_pool.skipped}, "
+            f"{len(render_pool.errors)} failed"
+        )
+        for output_filename, error in render_pool.errors:
+            print("render error in", output_filename, error)
 
-    success_rate = success_count / len(file_list) * 100
-    print(f"success rate: {success_rate:.1f}%")
+    success_rate = success_count / len(file_list) * 100 if file_list else 0.0
+    print(f"success rate: {success_rate:.1f}%, results in {results_path}")
 
 
-print("\nautomating graphs without cheaters...\n\n")
-automate_lachesis("../inputs/graphs", "../inputs/results", True, False)
-print("\n\nautomating graphs with cheaters...\n\n")
-automate_lachesis("../inputs/cheaters", "../inputs/cheaters_results", True, False)
+if __name__ == "__main__":
+    print("\nautomating graphs without cheaters...\n\n")
+    automate_lachesis("../inputs/graphs", "../inputs/results", True, False)
+    print("\n\nautomating graphs with cheaters...\n\n")
+    automate_lachesis("../inputs/cheaters", "../inputs/cheaters_results", True, False)
@@ -0,0 +1,38 @@
+import glob
+import os
+import sys
+import time
+from lachesis import Lachesis
+
+# atropos_voting invocations per event with the re-scan of every undecided frame
+# after each event and with the pending-roots election, which only calls it for
+# roots that still have a vote to cast
+
+
+def count(input_filenames, election):
+    totals = {"events": 0, "calls": 0, "roots": 0, "seconds": 0.0}
+    for input_filename in input_filenames:
+        lachesis_state = Lachesis(election=election)
+        start = time.perf_counter()
+        lachesis_state.run_lachesis(input_filename, None)
+        totals["seconds"] += time.perf_counter() - start
+        totals["events"] += len(lachesis_state.events)
+        totals["calls"] += lachesis_state.atropos_voting_calls
+        totals["roots"] += sum(
+            len(roots) for roots in lachesis_state.root_set_events.values()
+        )
+    return totals
+
+
+if __name__ == "__main__":
+    input_dir = sys.argv[1] if len(sys.argv) > 1 else "../inputs/graphs"
+    limit = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    input_filenames = sorted(glob.glob(os.path.join(input_dir, "graph_*.txt")))[:limit]
+    for election in ["rescan", "pending"]:
+        totals = count(input_filenames, election)
+        print(
+            f"{election:>8}: {totals['calls'] / max(totals['events'], 1):7.2f} "
+            f"atropos_voting calls/event, "
+            f"{totals['calls'] / max(totals['roots'], 1):7.2f} calls/root, "
+            f"{totals['seconds']:.2f}s over {totals['events']} events"
+        )
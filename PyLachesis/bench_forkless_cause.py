@@ -0,0 +1,38 @@
+import glob
+import os
+import sys
+from lachesis import Lachesis, LachesisMultiInstance
+
+# hit/miss counters of the forkless_cause cache over a corpus, single instance and
+# summed over all validator instances of the multi-instance runs
+
+
+def count(input_filenames):
+    totals = {"single": [0, 0], "multi": [0, 0]}
+    for input_filename in input_filenames:
+        lachesis_state = Lachesis(forkless_cause_cache=True)
+        lachesis_state.run_lachesis(input_filename, None)
+        totals["single"][0] += lachesis_state.forkless_cause_hits
+        totals["single"][1] += lachesis_state.forkless_cause_misses
+
+        lachesis_multi_instance = LachesisMultiInstance(
+            engine_options={"forkless_cause_cache": True}
+        )
+        lachesis_multi_instance.file_path = input_filename
+        lachesis_multi_instance.process()
+        for instance in lachesis_multi_instance.instances.values():
+            totals["multi"][0] += instance.forkless_cause_hits
+            totals["multi"][1] += instance.forkless_cause_misses
+    return totals
+
+
+if __name__ == "__main__":
+    input_dir = sys.argv[1] if len(sys.argv) > 1 else "../inputs/cheaters"
+    limit = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    input_filenames = sorted(glob.glob(os.path.join(input_dir, "graph_*.txt")))[:limit]
+    for mode, (hits, misses) in count(input_filenames).items():
+        calls = hits + misses
+        print(
+            f"{mode:>6}: {calls} forkless_cause calls, {hits} hits, {misses} misses "
+            f"({100 * hits / max(calls, 1):.1f}% hit rate)"
+        )
@@ -0,0 +1,94 @@
+import json
+import os
+import subprocess
+import sys
+
+# import time and memory of the modules in a fresh interpreter, the cost every worker
+# process pays before doing anything. the consensus modules must not load the
+# plotting libraries, exits with status 1 if one does
+#
+#   python bench_import.py [repeat]
+
+PLOTTING = ("matplotlib", "networkx")
+
+# (directory, module, plotting modules it must not load), None for reference rows
+MODULES = [
+    (".", "lachesis", PLOTTING),
+    (".", "dag_cache", PLOTTING),
+    (".", "instance_pool", PLOTTING),
+    (".", "checkpoint", PLOTTING),
+    (".", "network_simulator", PLOTTING),
+    (".", "automate_lachesis", PLOTTING),
+    (".", "render_pool", PLOTTING),
+    (".", "graph_writer", PLOTTING),
+    ("../inputs", "graph", ("matplotlib",)),
+    (".", "matplotlib.pyplot", None),
+    (".", "networkx", None),
+]
+
+MEASURE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": seconds,
+    "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "loaded": sorted(m for m in {plotting!r} if m in sys.modules),
+}}))
+"""
+
+
+def measure(directory, module, repeat=5):
+    # the best run, or {"error": last line of the traceback} if the import fails
+    best = None
+    for _ in range(repeat):
+        process = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                MEASURE.format(module=module, plotting=PLOTTING),
+            ],
+            cwd=directory,
+            capture_output=True,
+            text=True,
+        )
+        if process.returncode != 0:
+            lines = process.stderr.strip().splitlines()
+            return {
+                "error": lines[-1] if lines else f"exit status {process.returncode}"
+            }
+        result = json.loads(process.stdout)
+        if best is None or result["seconds"] < best["seconds"]:
+            best = result
+    return best
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    here = os.path.dirname(os.path.abspath(__file__))
+    failures = []
+    for directory, module, forbidden in MODULES:
+        result = measure(os.path.join(here, directory), module, repeat)
+        if "error" in result:
+            # a module that needs a plotting library which is not installed fails
+            # on importing it, it loads it just the same
+            missing = [
+                m for m in forbidden or () if f"No module named '{m}" in result["error"]
+            ]
+            if missing:
+                failures.append((module, missing))
+            print(f"{module:>18}: unavailable, {result['error']}")
+            continue
+        loaded = [m for m in result["loaded"] if forbidden and m in forbidden]
+        if loaded:
+            failures.append((module, loaded))
+        print(
+            f"{module:>18}: {result['seconds'] * 1000:7.1f}ms, "
+            f"max rss {result['max_rss_kb'] / 1024:6.1f} MiB"
+            + (f", loads {', '.join(loaded)}" if loaded else "")
+            + (" (reference)" if forbidden is None else "")
+        )
+    for module, loaded in failures:
+        print(f"{module} must not import {', '.join(loaded)}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,36 @@
+import glob
+import os
+import sys
+import time
+from lachesis import Lachesis
+
+# ancestors whose lowest_observing entry is looked at per event, with the reference
+# BFS and with the bounded propagation (which also reports the ancestors skipped
+# through the watermarks without a lookup)
+
+
+def count(input_filenames, propagation):
+    totals = {"events": 0, "checks": 0, "skips": 0, "seconds": 0.0}
+    for input_filename in input_filenames:
+        lachesis_state = Lachesis(lowest_observing_propagation=propagation)
+        start = time.perf_counter()
+        lachesis_state.run_lachesis(input_filename, None)
+        totals["seconds"] += time.perf_counter() - start
+        totals["events"] += len(lachesis_state.events)
+        totals["checks"] += lachesis_state.lowest_observing_checks
+        totals["skips"] += lachesis_state.lowest_observing_skips
+    return totals
+
+
+if __name__ == "__main__":
+    input_dir = sys.argv[1] if len(sys.argv) > 1 else "../inputs/graphs"
+    limit = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    input_filenames = sorted(glob.glob(os.path.join(input_dir, "graph_*.txt")))[:limit]
+    for propagation in ["bfs", "bounded"]:
+        totals = count(input_filenames, propagation)
+        events = max(totals["events"], 1)
+        print(
+            f"{propagation:>8}: {totals['checks'] / events:7.1f} visited/event, "
+            f"{totals['skips'] / events:7.1f} skipped/event, "
+            f"{totals['seconds']:.2f}s over {totals['events']} events"
+        )
@@ -0,0 +1,108 @@
+import sys
+import tracemalloc
+from lachesis import Event, Lachesis
+
+# compares the memory held by the events of a processed graph in two layouts:
+# - the previous Event layout: __dict__ per event, {"uuid": ..., "sequence": ...}
+#   dicts as observation entries
+# - the current slotted Event with packed (sequence, id) observation entries
+# and the memory of validator_visited_events as sets of event ids and as the
+# bytearrays the engine keeps
+
+
+class DictEvent:
+    def __init__(self, event):
+        self.validator = event.validator
+        self.timestamp = event.timestamp
+        self.original_sequence = event.original_sequence
+        self.sequence = event.sequence
+        self.weight = event.weight
+        self.uuid = event.uuid
+        self.frame = event.frame
+        self.root = event.root
+        self.atropos = event.atropos
+        self.highest_observed = {
+            v: {"uuid": event.uuid, "sequence": s}
+            for v, (s, _) in event.highest_observed.items()
+        }
+        self.lowest_observing = {
+            v: {"uuid": event.uuid, "sequence": s}
+            for v, (s, _) in event.lowest_observing.items()
+        }
+        self.parents = [event.uuid for _ in event.parents]
+        self.visited = {
+            v: {"uuid": event.uuid, "sequence": s}
+            for v, (s, _) in event.visited.items()
+        }
+        self.last_event = event.last_event
+        self.direct_parents = {event.uuid for _ in event.direct_parents}
+
+
+def copy_event(event):
+    # fresh tuples for every entry, the engine shares them between events where it can
+    copied = Event.from_template(event.to_template())
+    copied.frame = event.frame
+    copied.root = event.root
+    copied.atropos = event.atropos
+    copied.highest_observed = {v: tuple(e) for v, e in event.highest_observed.items()}
+    copied.lowest_observing = {v: tuple(e) for v, e in event.lowest_observing.items()}
+    copied.visited = {v: tuple(e) for v, e in event.visited.items()}
+    copied.direct_parents = set(event.direct_parents)
+    return copied
+
+
+def measure(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, result
+
+
+def benchmark(input_filename):
+    lachesis_state = Lachesis()
+    lachesis_state.run_lachesis(input_filename, None)
+    events = lachesis_state.events
+    num_events = len(events)
+
+    dict_size, _ = measure(lambda: [DictEvent(event) for event in events])
+    slot_size, _ = measure(lambda: [copy_event(event) for event in events])
+
+    print(
+        f"{input_filename}: {num_events} events, "
+        f"{len(lachesis_state.validator_weights)} validators"
+    )
+    for name, size in [
+        ("dict Event", dict_size),
+        ("slotted Event", slot_size),
+    ]:
+        print(
+            f"  {name:<14} {size / 1024:10.1f} KiB  {size / num_events:8.1f} B/event  "
+            f"{dict_size / size:5.1f}x"
+        )
+
+    visited_events = lachesis_state.validator_visited_events
+    visited_set_size, _ = measure(
+        lambda: {
+            v: {event.id for event in events if visited[event.id]}
+            for v, visited in visited_events.items()
+        }
+    )
+    visited_array_size, _ = measure(
+        lambda: {v: bytearray(visited) for v, visited in visited_events.items()}
+    )
+    entries = num_events * len(visited_events)
+    for name, size in [
+        ("visited sets", visited_set_size),
+        ("visited arrays", visited_array_size),
+    ]:
+        print(
+            f"  {name:<14} {size / 1024:10.1f} KiB  "
+            f"{size / entries:8.1f} B/(validator, event)"
+        )
+
+
+if __name__ == "__main__":
+    for input_filename in sys.argv[1:] or ["../inputs/graphs/graph_400.txt"]:
+        benchmark(input_filename)
@@ -0,0 +1,535 @@
+import io
+import os
+import pickle
+import struct
+import sys
+import zlib
+from lachesis import Event, EventTemplate, Lachesis, LachesisMultiInstance
+
+# checkpoints of a LachesisMultiInstance run (checkpoint_path=...) or of a single
+# Lachesis.run_lachesis (checkpoint_path=...), and resuming from them (resume_from)
+#
+# a checkpoint file is append-only
+# header: magic, version, flags (SINGLE_INSTANCE for a Lachesis run), sha1 of the
+#         input graph file
+# frames: kind, payload size, crc32 of the payload, timestamp, payload
+#   snapshot  the whole run state after timestamp: the input file path, then the
+#             zlib compressed pickle of the state, with the event records stored as
+#             their ids into the input graph
+#   delta     the zlib compressed pickle of what changed since the previous frame:
+#               operations  in the order the run made them, the instances created
+#                           (fresh or as a snapshot of history_state) and the calls
+#                           on every state (validator, None for history_state and for
+#                           a single Lachesis): its (de)activations and the events
+#                           it processed, as (id, parents)
+#               tables      per state, its frame and the entries of its root,
+#                           atropos and cheater tables added since, and its request
+#                           counters
+#               attributes  the attributes of the LachesisMultiInstance that
+#                           changed, and the events appended to its seen_events
+# resuming loads the last snapshot and applies the deltas after it in order: the
+# events are processed again from their records, everything but the processing is
+# set from the delta, and the tables of every state are checked against the ones
+# recorded. a delta costs about what the run did in its interval, every
+# SNAPSHOT_INTERVAL-th frame is a snapshot so that a resume applies at most
+# SNAPSHOT_INTERVAL - 1 deltas. with workers, the main process only has the frame of
+# an instance, the other tables are not recorded. a frame cut short by a crash fails
+# its size or crc check, it is dropped with everything after it
+#
+#   python checkpoint.py [graph file] [checkpoint file] [interval]
+# resumes the run from the checkpoint file if it exists, and starts it otherwise
+
+CHECKPOINT_MAGIC = b"LCKP"
+CHECKPOINT_VERSION = 3
+CHECKPOINT_HEADER = struct.Struct("<4sHH40s")
+FRAME_HEADER = struct.Struct("<cIIq")
+SNAPSHOT_FRAME = b"S"
+DELTA_FRAME = b"D"
+SNAPSHOT_INTERVAL = 8
+SINGLE_INSTANCE = 1
+REQUEST_COUNTERS = ("requests_served", "request_walks", "request_walk_steps")
+
+# configuration of the run that resumes, not part of the checkpointed state
+RUNTIME_ATTRIBUTES = (
+    "graph_results",
+    "workers",
+    "instance_pool",
+    "checkpoint_path",
+    "checkpoint_interval",
+    "checkpointer",
+)
+# the LachesisMultiInstance attributes a delta does not store whole
+DELTA_ATTRIBUTES = RUNTIME_ATTRIBUTES + (
+    "file_path",
+    "instances",
+    "history_state",
+    "seen_events",
+)
+
+
+class StatePickler(pickle.Pickler):
+    def __init__(self, file, run, records):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.run = run
+        self.records = records
+
+    def persistent_id(self, obj):
+        if type(obj) is EventTemplate and self.records.get(obj.id) is obj:
+            return obj.id
+        # frame listeners are bound to the run
+        if obj is self.run:
+            return "run"
+        return None
+
+
+class StateUnpickler(pickle.Unpickler):
+    def __init__(self, file, run, records):
+        super().__init__(file)
+        self.run = run
+        self.records = records
+
+    def persistent_load(self, persistent_id):
+        if persistent_id == "run":
+            return self.run
+        return self.records[persistent_id]
+
+
+def event_records(file_path):
+    from dag_cache import get_event_templates
+
+    return {template.id: template for template in get_event_templates(file_path)}
+
+
+def run_states(run):
+    # the states a delta records, by validator
+    if isinstance(run, Lachesis):
+        return {None: run}
+    lachesis_states = dict(run.instances)
+    if run.history_state is not None:
+        lachesis_states[None] = run.history_state
+    return lachesis_states
+
+
+def recorded_events(events):
+    return [(event.id, tuple(event.parents)) for event in events]
+
+
+def replayed_events(recorded, records):
+    events = []
+    for event_id, parents in recorded:
+        event = Event.__new__(Event)
+        event.set_record(records[event_id])
+        event.parents = list(parents)
+        events.append(event)
+    return events
+
+
+def state_tables(lachesis_state, baseline):
+    # the tables of lachesis_state that changed since baseline, which is brought up
+    # to date. an instance mirror only has its frame and counters
+    tables = {
+        "frame": lachesis_state.frame,
+        "counters": tuple(getattr(lachesis_state, name) for name in REQUEST_COUNTERS),
+    }
+    if not isinstance(lachesis_state, Lachesis):
+        return tables
+
+    tables["block"] = lachesis_state.block
+    atropos_roots = baseline.setdefault("atropos_roots", {})
+    tables["atropos_roots"] = {
+        frame: event_id
+        for frame, event_id in lachesis_state.atropos_roots.items()
+        if atropos_roots.get(frame) != event_id
+    }
+    atropos_roots.update(tables["atropos_roots"])
+
+    root_counts = baseline.setdefault("root_set_events", {})
+    tables["root_set_events"] = {
+        frame: [event.id for event in roots[root_counts.get(frame, 0) :]]
+        for frame, roots in lachesis_state.root_set_events.items()
+        if len(roots) != root_counts.get(frame, 0)
+    }
+    for frame in tables["root_set_events"]:
+        root_counts[frame] = len(lachesis_state.root_set_events[frame])
+
+    cheater_counts = baseline.setdefault("validator_cheater_list", {})
+    tables["validator_cheater_list"] = {
+        validator: sorted(cheaters)
+        for validator, cheaters in lachesis_state.validator_cheater_list.items()
+        if len(cheaters) != cheater_counts.get(validator)
+    }
+    for validator, cheaters in tables["validator_cheater_list"].items():
+        cheater_counts[validator] = len(cheaters)
+    return tables
+
+
+def attribute_pickles(lachesis_multi_instance):
+    return {
+        name: pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        for name, value in vars(lachesis_multi_instance).items()
+        if name not in DELTA_ATTRIBUTES
+    }
+
+
+def read_frames(checkpoint_path):
+    # the flags, the input hash, the valid frames as (kind, timestamp, payload) and
+    # the offset where they end
+    with open(checkpoint_path, "rb") as file:
+        data = file.read()
+    if len(data) < CHECKPOINT_HEADER.size:
+        raise ValueError(f"{checkpoint_path}: not a checkpoint file")
+    magic, version, flags, input_hash = CHECKPOINT_HEADER.unpack_from(data)
+    if magic != CHECKPOINT_MAGIC:
+        raise ValueError(f"{checkpoint_path}: not a checkpoint file")
+    if version != CHECKPOINT_VERSION:
+        raise ValueError(f"{checkpoint_path}: unsupported checkpoint version {version}")
+
+    frames = []
+    offset = CHECKPOINT_HEADER.size
+    while offset + FRAME_HEADER.size <= len(data):
+        kind, size, crc, timestamp = FRAME_HEADER.unpack_from(data, offset)
+        start = offset + FRAME_HEADER.size
+        payload = data[start : start + size]
+        if (
+            kind not in (SNAPSHOT_FRAME, DELTA_FRAME)
+            or len(payload) < size
+            or zlib.crc32(payload) != crc
+        ):
+            break
+        frames.append((kind, timestamp, payload))
+        offset = start + size
+    return flags, input_hash.decode("ascii"), frames, offset
+
+
+class Checkpointer:
+    def __init__(
+        self,
+        run,
+        file_path,
+        checkpoint_path,
+        interval,
+        records=None,
+        input_hash=None,
+    ):
+        from dag_cache import file_hash
+
+        # run: the LachesisMultiInstance or the single Lachesis checkpointed
+        self.run = run
+        self.file_path = file_path
+        self.checkpoint_path = checkpoint_path
+        self.interval = interval
+        self.records = event_records(file_path) if records is None else records
+        self.input_hash = file_hash(file_path) if input_hash is None else input_hash
+        self.since_frame = 0
+        # deltas since the last snapshot, None before the first snapshot
+        self.since_snapshot = None
+        self.snapshot_frames = 0
+        self.delta_frames = 0
+        self.bytes_written = 0
+        # the file is created with the first frame
+        self.created = False
+        # what the next delta holds, and the state it is taken against
+        self.operations = []
+        self.baselines = {}
+        self.attribute_pickles = {}
+        self.seen_count = 0
+
+    def continue_file(self, end, since_snapshot):
+        # appends to the frames up to end of an existing checkpoint file instead
+        with open(self.checkpoint_path, "r+b") as file:
+            file.truncate(end)
+        self.created = True
+        self.since_snapshot = since_snapshot
+
+    def record(self, operation):
+        # called by the run for every change of a state a delta replays
+        if operation[0] == "process":
+            kind, validator, events = operation
+            operation = (kind, validator, recorded_events(events))
+        self.operations.append(operation)
+
+    def mark(self):
+        # the next delta starts here
+        self.operations = []
+        self.baselines = {}
+        for validator, lachesis_state in run_states(self.run).items():
+            state_tables(lachesis_state, self.baselines.setdefault(validator, {}))
+        if isinstance(self.run, LachesisMultiInstance):
+            self.attribute_pickles = attribute_pickles(self.run)
+            self.seen_count = len(self.run.seen_events)
+
+    def timestamp_processed(self, timestamp):
+        self.since_frame += 1
+        if self.since_frame < self.interval:
+            return
+        self.since_frame = 0
+        if self.since_snapshot is None or self.since_snapshot + 1 >= SNAPSHOT_INTERVAL:
+            self.write_frame(SNAPSHOT_FRAME, timestamp, self.snapshot_payload())
+            self.since_snapshot = 0
+            self.snapshot_frames += 1
+            self.mark()
+        else:
+            self.write_frame(DELTA_FRAME, timestamp, self.delta_payload())
+            self.since_snapshot += 1
+            self.delta_frames += 1
+            self.operations = []
+
+    def snapshot_payload(self):
+        state = dict(vars(self.run))
+        for name in RUNTIME_ATTRIBUTES:
+            state.pop(name, None)
+        if getattr(self.run, "instance_pool", None) is not None:
+            state["instances"] = self.run.instance_pool.collect()
+
+        file = io.BytesIO()
+        StatePickler(file, self.run, self.records).dump(state)
+        return pickle.dumps(self.file_path, pickle.HIGHEST_PROTOCOL) + zlib.compress(
+            file.getvalue(), 1
+        )
+
+    def delta_payload(self):
+        delta = {
+            "operations": self.operations,
+            "tables": {
+                validator: state_tables(
+                    lachesis_state, self.baselines.setdefault(validator, {})
+                )
+                for validator, lachesis_state in run_states(self.run).items()
+            },
+        }
+        if isinstance(self.run, LachesisMultiInstance):
+            pickles = attribute_pickles(self.run)
+            delta["attributes"] = {
+                name: vars(self.run)[name]
+                for name, value in pickles.items()
+                if self.attribute_pickles.get(name) != value
+            }
+            self.attribute_pickles = pickles
+            delta["seen_events"] = recorded_events(
+                self.run.seen_events[self.seen_count :]
+            )
+            self.seen_count = len(self.run.seen_events)
+        return zlib.compress(pickle.dumps(delta, pickle.HIGHEST_PROTOCOL), 1)
+
+    def write_frame(self, kind, timestamp, payload):
+        if not self.created:
+            with open(self.checkpoint_path, "wb") as file:
+                file.write(
+                    CHECKPOINT_HEADER.pack(
+                        CHECKPOINT_MAGIC,
+                        CHECKPOINT_VERSION,
+                        SINGLE_INSTANCE if isinstance(self.run, Lachesis) else 0,
+                        self.input_hash.encode("ascii"),
+                    )
+                )
+            self.created = True
+        with open(self.checkpoint_path, "ab") as file:
+            file.write(
+                FRAME_HEADER.pack(kind, len(payload), zlib.crc32(payload), timestamp)
+            )
+            file.write(payload)
+        self.bytes_written += FRAME_HEADER.size + len(payload)
+
+
+def load_checkpoint(run, checkpoint_path):
+    # the last snapshot of checkpoint_path and the deltas after it
+    from dag_cache import file_hash
+
+    flags, input_hash, frames, end = read_frames(checkpoint_path)
+    if bool(flags & SINGLE_INSTANCE) != isinstance(run, Lachesis):
+        raise ValueError(
+            f"{checkpoint_path}: checkpoint of a "
+            f"{'single' if flags & SINGLE_INSTANCE else 'multi'}-instance run"
+        )
+    snapshots = [i for i, frame in enumerate(frames) if frame[0] == SNAPSHOT_FRAME]
+    if not snapshots:
+        raise ValueError(f"{checkpoint_path}: no snapshot to resume from")
+    last_snapshot = snapshots[-1]
+    _, timestamp, payload = frames[last_snapshot]
+
+    file = io.BytesIO(payload)
+    file_path = pickle.load(file)
+    if file_hash(file_path) != input_hash:
+        raise ValueError(f"{checkpoint_path}: {file_path} changed since the checkpoint")
+    records = event_records(file_path)
+    state = StateUnpickler(
+        io.BytesIO(zlib.decompress(file.read())), run, records
+    ).load()
+    deltas = [
+        (delta_timestamp, pickle.loads(zlib.decompress(delta_payload)))
+        for _, delta_timestamp, delta_payload in frames[last_snapshot + 1 :]
+    ]
+    return file_path, records, input_hash, state, timestamp, deltas, end
+
+
+def apply_delta(run, lachesis_states, delta, timestamp, baselines, records):
+    for operation in delta["operations"]:
+        kind, validator = operation[:2]
+        if kind == "create":
+            lachesis_states[validator] = run.create_instance(validator)
+        elif kind == "snapshot":
+            lachesis_states[validator] = run.create_instance(
+                validator, run.history_state.snapshot(validator)
+            )
+        elif kind == "call":
+            name, args = operation[2:]
+            getattr(lachesis_states[validator], name)(*args)
+        else:
+            lachesis_states[validator].process_events(
+                replayed_events(operation[2], records)
+            )
+
+    for validator, tables in delta["tables"].items():
+        lachesis_state = lachesis_states[validator]
+        replayed = state_tables(lachesis_state, baselines.setdefault(validator, {}))
+        if any(
+            replayed[name] != value
+            for name, value in tables.items()
+            if name != "counters"
+        ):
+            raise ValueError(
+                f"resumed run differs from its checkpoint at timestamp {timestamp}"
+            )
+        for name, value in zip(REQUEST_COUNTERS, tables["counters"]):
+            setattr(lachesis_state, name, value)
+
+    if isinstance(run, LachesisMultiInstance):
+        vars(run).update(delta["attributes"])
+        run.seen_events.extend(replayed_events(delta["seen_events"], records))
+
+
+def restore_checkpoint(lachesis_multi_instance, checkpoint_path):
+    # restores the last snapshot of checkpoint_path into lachesis_multi_instance and
+    # applies the deltas after it, returns the parsed events and the first timestamp
+    # left to process
+    (
+        file_path,
+        records,
+        input_hash,
+        state,
+        timestamp,
+        deltas,
+        end,
+    ) = load_checkpoint(lachesis_multi_instance, checkpoint_path)
+    lachesis_multi_instance.file_path = file_path
+    event_list, event_validators = lachesis_multi_instance.parse_events()
+
+    instances = state.pop("instances")
+    vars(lachesis_multi_instance).update(state)
+    # the deltas are applied to the Lachesis instances themselves, without the
+    # frame listeners, the frame tracking of the run is restored with the rest
+    instance_pool = lachesis_multi_instance.instance_pool
+    lachesis_multi_instance.instance_pool = None
+    try:
+        lachesis_multi_instance.instances = instances
+        for lachesis_instance in instances.values():
+            lachesis_instance.frame_listener = None
+        baselines = {}
+        for validator, lachesis_state in run_states(lachesis_multi_instance).items():
+            state_tables(lachesis_state, baselines.setdefault(validator, {}))
+        for timestamp, delta in deltas:
+            lachesis_states = run_states(lachesis_multi_instance)
+            apply_delta(
+                lachesis_multi_instance,
+                lachesis_states,
+                delta,
+                timestamp,
+                baselines,
+                records,
+            )
+            lachesis_states.pop(None, None)
+            lachesis_multi_instance.instances = lachesis_states
+    finally:
+        lachesis_multi_instance.instance_pool = instance_pool
+
+    instances = lachesis_multi_instance.instances
+    lachesis_multi_instance.instances = {}
+    for validator, lachesis_instance in instances.items():
+        instance_mirror = lachesis_multi_instance.create_instance(
+            validator, lachesis_instance
+        )
+        if instance_mirror is not lachesis_instance:
+            # with workers the requests are served, and counted, by the mirrors
+            for name in REQUEST_COUNTERS:
+                setattr(instance_mirror, name, getattr(lachesis_instance, name))
+                setattr(lachesis_instance, name, 0)
+            lachesis_instance = instance_mirror
+        lachesis_multi_instance.instances[validator] = lachesis_instance
+        lachesis_multi_instance.watch_instance(lachesis_instance)
+
+    if lachesis_multi_instance.checkpoint_path is None:
+        lachesis_multi_instance.checkpoint_path = checkpoint_path
+    checkpointer = Checkpointer(
+        lachesis_multi_instance,
+        file_path,
+        lachesis_multi_instance.checkpoint_path,
+        lachesis_multi_instance.checkpoint_interval,
+        records,
+        input_hash,
+    )
+    checkpointer.mark()
+    if lachesis_multi_instance.checkpoint_path == checkpoint_path:
+        checkpointer.continue_file(end, len(deltas))
+    lachesis_multi_instance.checkpointer = checkpointer
+    return event_list, event_validators, timestamp + 1
+
+
+def restore_lachesis(lachesis_state, checkpoint_path, checkpoint_interval=100):
+    # the same for a single Lachesis run, returns the events left to process and
+    # the checkpointer that continues checkpoint_path
+    (
+        file_path,
+        records,
+        input_hash,
+        state,
+        timestamp,
+        deltas,
+        end,
+    ) = load_checkpoint(lachesis_state, checkpoint_path)
+    vars(lachesis_state).update(state)
+    baselines = {None: {}}
+    state_tables(lachesis_state, baselines[None])
+    for timestamp, delta in deltas:
+        apply_delta(
+            lachesis_state, {None: lachesis_state}, delta, timestamp, baselines, records
+        )
+
+    checkpointer = Checkpointer(
+        lachesis_state,
+        file_path,
+        checkpoint_path,
+        checkpoint_interval,
+        records,
+        input_hash,
+    )
+    checkpointer.mark()
+    checkpointer.continue_file(end, len(deltas))
+    event_list = [
+        Event.from_template(template)
+        for template in records.values()
+        if template.timestamp > timestamp
+    ]
+    return event_list, checkpointer
+
+
+if __name__ == "__main__":
+    input_filename = (
+        sys.argv[1] if len(sys.argv) > 1 else "../inputs/graphs/graph_58.txt"
+    )
+    checkpoint_path = sys.argv[2] if len(sys.argv) > 2 else "./checkpoint.lckp"
+    interval = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+
+    lachesis_multi_instance = LachesisMultiInstance(
+        checkpoint_path=checkpoint_path, checkpoint_interval=interval
+    )
+    if os.path.exists(checkpoint_path):
+        lachesis_multi_instance.resume_from(checkpoint_path)
+    else:
+        lachesis_multi_instance.file_path = input_filename
+        lachesis_multi_instance.process()
+    checkpointer = lachesis_multi_instance.checkpointer
+    print(
+        f"{lachesis_multi_instance.file_path}: {checkpointer.snapshot_frames} "
+        f"snapshots and {checkpointer.delta_frames} deltas, "
+        f"{checkpointer.bytes_written} bytes written to {checkpoint_path}"
+    )
@@ -0,0 +1,101 @@
+import glob
+import os
+import sys
+from lachesis import Lachesis, LachesisMultiInstance
+
+# differential check of an engine option against the reference (default) engine:
+# runs both on the same graphs and reports every result that differs
+#
+#   python compare_engines.py vector_clocks ../inputs/cheaters
+#   python compare_engines.py option=value [more options] <graph files or dirs>
+
+
+def summarize(lachesis_state):
+    return {
+        "frame": lachesis_state.frame,
+        "block": lachesis_state.block,
+        "frame_to_decide": lachesis_state.frame_to_decide,
+        "atropos_roots": dict(lachesis_state.atropos_roots),
+        "quorum_cache": dict(lachesis_state.quorum_cache),
+        "root_set_events": {
+            f: sorted(root.id for root in roots)
+            for f, roots in lachesis_state.root_set_events.items()
+        },
+        "suspected_cheaters": set(lachesis_state.suspected_cheaters),
+        "validator_cheater_list": {
+            v: set(cheaters)
+            for v, cheaters in lachesis_state.validator_cheater_list.items()
+        },
+        "validator_cheater_times": dict(lachesis_state.validator_cheater_times),
+        "validator_cheater_frames": dict(lachesis_state.validator_cheater_frames),
+        "events": [
+            (event.id, event.sequence, event.frame, event.root, event.atropos)
+            for event in lachesis_state.events
+        ],
+    }
+
+
+def differences(reference, candidate, prefix=""):
+    return [prefix + key for key in reference if reference[key] != candidate.get(key)]
+
+
+def compare(input_filename, engine_options, multi_instance=True):
+    reference = Lachesis()
+    reference.run_lachesis(input_filename, None)
+    candidate = Lachesis(**engine_options)
+    candidate.run_lachesis(input_filename, None)
+    mismatches = differences(summarize(reference), summarize(candidate))
+
+    if multi_instance:
+        reference_multi = LachesisMultiInstance()
+        reference_multi.file_path = input_filename
+        reference_multi.process()
+        candidate_multi = LachesisMultiInstance(engine_options=engine_options)
+        candidate_multi.file_path = input_filename
+        candidate_multi.process()
+        if set(reference_multi.instances) != set(candidate_multi.instances):
+            mismatches.append("instances")
+        for validator, instance in reference_multi.instances.items():
+            if validator in candidate_multi.instances:
+                mismatches += differences(
+                    summarize(instance),
+                    summarize(candidate_multi.instances[validator]),
+                    f"instance {validator}: ",
+                )
+
+    return mismatches
+
+
+def parse_option(argument):
+    name, _, value = argument.partition("=")
+    if not value:
+        return name, True
+    if value.isdigit():
+        return name, int(value)
+    if value in ("True", "False"):
+        return name, value == "True"
+    return name, value
+
+
+if __name__ == "__main__":
+    engine_options = {}
+    input_filenames = []
+    for argument in sys.argv[1:]:
+        if os.path.isdir(argument):
+            input_filenames += sorted(glob.glob(os.path.join(argument, "graph_*.txt")))
+        elif os.path.exists(argument):
+            input_filenames.append(argument)
+        else:
+            name, value = parse_option(argument)
+            engine_options[name] = value
+
+    failures = 0
+    for input_filename in input_filenames:
+        mismatches = compare(input_filename, engine_options)
+        if mismatches:
+            failures += 1
+            print(f"{input_filename}: {', '.join(mismatches)}")
+
+    matching = len(input_filenames) - failures
+    print(f"{engine_options}: {matching}/{len(input_filenames)} graphs match")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,90 @@
+import hashlib
+import os
+from collections import OrderedDict
+from lachesis import load_events
+
+
+def file_hash(file_path):
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DagCache:
+    # parsed DAGs keyed by (absolute path, content hash), kept in memory with LRU
+    # eviction and, if cache_dir is set, also written to disk as .ldag files
+    # entries are tuples of immutable EventTemplates, consumers build their own
+    # mutable events from them with Event.from_template
+    def __init__(self, max_entries=8, cache_dir=None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, file_path):
+        content_hash = file_hash(file_path)
+        key = (os.path.abspath(file_path), content_hash)
+
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+        templates = None
+        ldag_path = None
+        if self.cache_dir is not None:
+            from ldag import LDAG_VERSION
+
+            # the format version is in the name, files of other versions are ignored
+            ldag_path = os.path.join(
+                self.cache_dir, f"{content_hash}.v{LDAG_VERSION}.ldag"
+            )
+            if os.path.exists(ldag_path):
+                self.disk_hits += 1
+                templates = self.to_templates(load_events(ldag_path))
+
+        if templates is None:
+            self.misses += 1
+            events = load_events(file_path)
+            templates = self.to_templates(events)
+            if ldag_path is not None:
+                from ldag import write_ldag
+
+                os.makedirs(self.cache_dir, exist_ok=True)
+                # write to a temporary name first so concurrent readers never
+                # see a partially written file
+                temporary_path = f"{ldag_path}.{os.getpid()}.tmp"
+                write_ldag(events, temporary_path)
+                os.replace(temporary_path, ldag_path)
+
+        self.entries[key] = templates
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return templates
+
+    def to_templates(self, events):
+        return tuple(event.to_template() for event in events)
+
+    def clear(self):
+        self.entries.clear()
+
+
+# shared by Lachesis.run_lachesis and LachesisMultiInstance, so a graph that is
+# run by both (as automate_lachesis does) is only parsed once
+default_dag_cache = DagCache()
+
+
+def configure_dag_cache(max_entries=8, cache_dir=None):
+    # replaces the shared cache, cache_dir keeps the parsed graphs on disk across
+    # processes and runs
+    global default_dag_cache
+    default_dag_cache = DagCache(max_entries, cache_dir)
+    return default_dag_cache
+
+
+def get_event_templates(file_path):
+    return default_dag_cache.get(file_path)
@@ -0,0 +1,69 @@
+import heapq
+
+# minimum frame over the validators that still count at a given time, kept with
+# lazily deleted heaps instead of a scan over all validators every tick
+# every tracked validator has a frame and optionally a deactivation time, after
+# which it no longer counts. validators whose deactivation time has passed move to a
+# second heap, so the time can also go back, as it does in the instances of
+# LachesisMultiInstance when requested events arrive late
+
+
+class FrameTracker:
+    def __init__(self):
+        # validator -> frame, validator -> deactivation time
+        self.frames = {}
+        self.deactivation_times = {}
+        self.expired = set()
+        # (frame, validator) of the tracked validators that are not expired
+        self.heap = []
+        # (deactivation time, validator) not expired yet, and
+        # (-deactivation time, validator) expired
+        self.expiring = []
+        self.restoring = []
+
+    def set_frame(self, validator, frame):
+        if self.frames.get(validator) != frame:
+            self.frames[validator] = frame
+            if validator not in self.expired:
+                heapq.heappush(self.heap, (frame, validator))
+
+    def remove(self, validator):
+        self.frames.pop(validator, None)
+
+    def set_deactivation_time(self, validator, time):
+        self.deactivation_times[validator] = time
+        if validator in self.expired:
+            self.expired.discard(validator)
+            if validator in self.frames:
+                heapq.heappush(self.heap, (self.frames[validator], validator))
+        heapq.heappush(self.expiring, (time, validator))
+
+    def minimum(self, time, default=1):
+        # validators count while time <= their deactivation time
+        while self.expiring and self.expiring[0][0] < time:
+            deactivation_time, validator = heapq.heappop(self.expiring)
+            if (
+                self.deactivation_times[validator] == deactivation_time
+                and validator not in self.expired
+            ):
+                self.expired.add(validator)
+                heapq.heappush(self.restoring, (-deactivation_time, validator))
+
+        while self.restoring and -self.restoring[0][0] >= time:
+            deactivation_time, validator = heapq.heappop(self.restoring)
+            deactivation_time = -deactivation_time
+            if (
+                self.deactivation_times[validator] == deactivation_time
+                and validator in self.expired
+            ):
+                self.expired.discard(validator)
+                heapq.heappush(self.expiring, (deactivation_time, validator))
+                if validator in self.frames:
+                    heapq.heappush(self.heap, (self.frames[validator], validator))
+
+        while self.heap:
+            frame, validator = self.heap[0]
+            if self.frames.get(validator) == frame and validator not in self.expired:
+                return frame
+            heapq.heappop(self.heap)
+        return default
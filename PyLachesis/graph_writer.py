@@ -0,0 +1,127 @@
+import os
+from html import escape
+from render_pool import node_color
+
+# the result graph of a RenderJob written as SVG or Graphviz DOT, without matplotlib
+# or networkx: the same layout as the PDF (a column per timestamp, a row per
+# validator, A at the bottom), node colors and labels validator_{timestamp,sequence,
+# weight}. Lachesis.graph_results writes these for an output file ending in .svg,
+# .dot or .gv
+#
+#   dot files pin the node positions, render them with neato -n2 -Tpdf
+
+COLUMN_WIDTH = 60
+ROW_HEIGHT = 60
+NODE_RADIUS = 22
+MARGIN = 40
+
+
+def node_positions(job):
+    # node -> (x, y) in svg units, y grows downwards
+    nodes = {(node[0], node[1]): node for node in job.nodes}
+    rows = [ord(validator) - 65 for validator, _ in nodes]
+    top_row = max(rows, default=0)
+    return nodes, {
+        (validator, timestamp): (
+            MARGIN + timestamp * COLUMN_WIDTH,
+            MARGIN + (top_row - (ord(validator) - 65)) * ROW_HEIGHT,
+        )
+        for validator, timestamp in nodes
+    }
+
+
+def edge_endpoints(start, end):
+    # from the border of the child node to the border of the parent node
+    dx = end[0] - start[0]
+    dy = end[1] - start[1]
+    length = (dx * dx + dy * dy) ** 0.5 or 1.0
+    ux = dx / length
+    uy = dy / length
+    return (
+        start[0] + ux * NODE_RADIUS,
+        start[1] + uy * NODE_RADIUS,
+        end[0] - ux * NODE_RADIUS,
+        end[1] - uy * NODE_RADIUS,
+    )
+
+
+def write_svg(job):
+    nodes, positions = node_positions(job)
+    width = max((x for x, _ in positions.values()), default=0) + MARGIN
+    height = max((y for _, y in positions.values()), default=0) + MARGIN
+
+    lines = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" font-family="serif">',
+        "<defs>",
+        '<marker id="arrow" viewBox="0 0 10 10" refX="10" refY="5" markerWidth="6" '
+        'markerHeight="6" orient="auto-start-reverse">',
+        '<path d="M 0 0 L 10 5 L 0 10 z" fill="black"/>',
+        "</marker>",
+        "</defs>",
+        '<g stroke="black" stroke-width="1" marker-end="url(#arrow)">',
+    ]
+    for child, parent in job.edges:
+        if child not in positions or parent not in positions:
+            continue
+        x1, y1, x2, y2 = edge_endpoints(positions[child], positions[parent])
+        lines.append(f'<line x1="{x1:.1f}" y1="{y1:.1f}" x2="{x2:.1f}" y2="{y2:.1f}"/>')
+    lines.append("</g>")
+
+    lines.append('<g font-size="12" font-weight="bold" text-anchor="middle">')
+    for node, (x, y) in positions.items():
+        validator, timestamp, sequence, weight, frame, root, atropos = nodes[node]
+        lines.append(
+            f'<circle cx="{x}" cy="{y}" r="{NODE_RADIUS}" '
+            f'fill="{node_color(frame, root, atropos)}"/>'
+        )
+        lines.append(
+            f'<text x="{x}" y="{y + 4}">{escape(validator)}<tspan font-size="8" '
+            f'dy="3">{timestamp},{sequence},{weight}</tspan></text>'
+        )
+    lines.append("</g>")
+    lines.append("</svg>")
+
+    with open(job.output_filename, "w") as file:
+        file.write("\n".join(lines) + "\n")
+    return job.output_filename
+
+
+def dot_escape(text):
+    # inside a double quoted DOT ID only the quote and the backslash are special
+    return text.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def write_dot(job):
+    nodes, positions = node_positions(job)
+    lines = [
+        "digraph lachesis {",
+        '  node [shape=circle, style=filled, fontname="serif", fixedsize=true, '
+        "width=0.6];",
+    ]
+    for node, (x, y) in positions.items():
+        validator, timestamp, sequence, weight, frame, root, atropos = nodes[node]
+        # graphviz y grows upwards, positions are in points
+        lines.append(
+            f'  "{dot_escape(validator)},{timestamp}" [pos="{x},{-y}", '
+            f'fillcolor="{node_color(frame, root, atropos)}", '
+            f"label=<<B>{escape(validator)}<SUB>{timestamp},{sequence},{weight}"
+            "</SUB></B>>];"
+        )
+    for child, parent in job.edges:
+        if child in positions and parent in positions:
+            lines.append(
+                f'  "{dot_escape(child[0])},{child[1]}" -> '
+                f'"{dot_escape(parent[0])},{parent[1]}";'
+            )
+    lines.append("}")
+
+    with open(job.output_filename, "w") as file:
+        file.write("\n".join(lines) + "\n")
+    return job.output_filename
+
+
+def write_graph(job):
+    if os.path.splitext(job.output_filename)[1].lower() == ".svg":
+        return write_svg(job)
+    return write_dot(job)
@@ -0,0 +1,181 @@
+from collections import deque
+import multiprocessing
+from lachesis import Lachesis
+
+# parallel execution of the LachesisMultiInstance validators
+# (LachesisMultiInstance(workers=n)): the Lachesis instances live in n worker
+# processes, each timestamp is a barrier. the main process keeps an InstanceMirror
+# per instance with what the defer and request phases read (known events with their
+# parents, leaves, queues, frames), so those phases still run in the sequential
+# order, and only the processing of the deferred events, the bulk of the work, is
+# spread over the workers. the instances receive the same calls in the same order as
+# in the sequential mode, so the results are identical
+
+
+def light_copy(event):
+    # the fields another instance reads when it serves a request
+    copy = event.cleared()
+    copy.direct_parents = event.direct_parents
+    return copy
+
+
+def serve(connection):
+    instances = {}
+    sent_events = {}
+    while True:
+        message, payload = connection.recv()
+        if message == "process":
+            results = []
+            for validator, new_instance, calls, process_queue in payload:
+                if new_instance is not None:
+                    instances[validator] = new_instance
+                    sent_events[validator] = len(new_instance.events)
+                instance = instances[validator]
+                for name, args in calls:
+                    getattr(instance, name)(*args)
+                instance.process_queue = process_queue
+                instance.process_deferred_events()
+
+                events = instance.events[sent_events[validator] :]
+                sent_events[validator] = len(instance.events)
+                results.append(
+                    (
+                        validator,
+                        instance.frame,
+                        instance.validator_highest_frame.get(validator),
+                        instance.leaves,
+                        [light_copy(event) for event in events],
+                    )
+                )
+            connection.send(results)
+        elif message == "collect":
+            connection.send(instances)
+        else:
+            break
+    connection.close()
+
+
+class InstanceMirror:
+    # stands in for a Lachesis instance in the main process
+
+    def __init__(self, lachesis_instance):
+        self.validator = lachesis_instance.validator
+        # a snapshot instance starts with history, a fresh one without
+        self.frame = lachesis_instance.frame
+        self.validator_highest_frame = dict(lachesis_instance.validator_highest_frame)
+        self.event_table = []
+        self.leaves = set(lachesis_instance.leaves)
+        self.request_queue = deque()
+        self.process_queue = {}
+        self.sync = lachesis_instance.sync
+        self.requests_served = 0
+        self.request_walks = 0
+        self.request_walk_steps = 0
+        self.frame_listener = None
+        # calls to replay on the instance before its next processing
+        self.calls = []
+        self.update(
+            self.frame,
+            None,
+            self.leaves,
+            [light_copy(event) for event in lachesis_instance.events],
+        )
+
+    get_event = Lachesis.get_event
+    defer_event = Lachesis.defer_event
+    process_request_queue = Lachesis.process_request_queue
+    process_request_batches = Lachesis.process_request_batches
+
+    def queue_activation(self, validator, frame, weight):
+        self.calls.append(("queue_activation", (validator, frame, weight)))
+
+    def queue_deactivation(self, validator, frame):
+        self.calls.append(("queue_deactivation", (validator, frame)))
+
+    def set_deactivation_time(self, validator, time):
+        self.calls.append(("set_deactivation_time", (validator, time)))
+
+    def update(self, frame, highest_frame, leaves, events):
+        for event in events:
+            if event.id >= len(self.event_table):
+                self.event_table.extend([None] * (event.id + 1 - len(self.event_table)))
+            self.event_table[event.id] = event
+        self.leaves = leaves
+        changed = frame != self.frame
+        self.frame = frame
+        if highest_frame is not None:
+            changed |= self.validator_highest_frame.get(self.validator) != highest_frame
+            self.validator_highest_frame[self.validator] = highest_frame
+        if changed and self.frame_listener is not None:
+            self.frame_listener(self)
+
+
+class InstancePool:
+    def __init__(self, workers):
+        context = multiprocessing.get_context()
+        self.connections = []
+        self.processes = []
+        for _ in range(workers):
+            connection, worker_connection = context.Pipe()
+            process = context.Process(
+                target=serve, args=(worker_connection,), daemon=True
+            )
+            process.start()
+            worker_connection.close()
+            self.connections.append(connection)
+            self.processes.append(process)
+        # validator -> mirror, worker index, and the instances not shipped yet
+        self.mirrors = {}
+        self.assignments = {}
+        self.new_instances = {}
+
+    def add_instance(self, lachesis_instance):
+        validator = lachesis_instance.validator
+        mirror = InstanceMirror(lachesis_instance)
+        self.mirrors[validator] = mirror
+        self.assignments[validator] = len(self.assignments) % len(self.connections)
+        self.new_instances[validator] = lachesis_instance
+        return mirror
+
+    def process_deferred_events(self):
+        payloads = [[] for _ in self.connections]
+        for validator, mirror in self.mirrors.items():
+            new_instance = self.new_instances.pop(validator, None)
+            if new_instance is None and not mirror.calls and not mirror.process_queue:
+                continue
+            payloads[self.assignments[validator]].append(
+                (validator, new_instance, mirror.calls, mirror.process_queue)
+            )
+            mirror.calls = []
+            mirror.process_queue = {}
+
+        # the barrier: every worker processes its instances, then all report back
+        busy = []
+        for connection, payload in zip(self.connections, payloads):
+            if payload:
+                connection.send(("process", payload))
+                busy.append(connection)
+        for connection in busy:
+            for validator, frame, highest_frame, leaves, events in connection.recv():
+                self.mirrors[validator].update(frame, highest_frame, leaves, events)
+
+    def collect(self):
+        # the instances, in the order they were added
+        instances = {}
+        for connection in self.connections:
+            connection.send(("collect", None))
+            instances.update(connection.recv())
+        instances.update(self.new_instances)
+        return {validator: instances[validator] for validator in self.mirrors}
+
+    def close(self):
+        for connection in self.connections:
+            try:
+                connection.send(("close", None))
+            except (BrokenPipeError, OSError):
+                pass
+            connection.close()
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
@@ -1,49 +1,139 @@
-from collections import deque
+from collections import deque, namedtuple
 import os
-import re
-import networkx as nx
-import matplotlib.pyplot as plt
-import matplotlib.colors as mcolors
+import warnings
 from sortedcontainers import SortedSet
 
+# the consensus engine only, the result graphs are drawn by render_pool.py and
+# graph_writer.py, which Lachesis.graph_results imports on first use
+
 # this variable dictates how much "foresight" validators are allowed to have
 # meaning, only validators within this field of view are known/seen and therefore
 # initialized
 global field_of_view
 field_of_view = 5
 
+# the visited arrays of validator_visited_events grow in chunks of this many event ids
+visited_chunk = 4096
+
+
+def tokenize_line(line):
+    # a line is a single run of whitespace separated tokens:
+    #   unique_id: <uuid> label: (A,2,2,1,False);
+    #   child_unique_id: <uuid> child_label: (A,1,1); ...
+    # returns (unique_id, validator, timestamp, sequence, weight, last_event,
+    # child_unique_ids) or None if the line is malformed
+    tokens = line.split()
+    num_tokens = len(tokens)
+    num_children = (num_tokens - 4) // 4
+
+    if (
+        num_tokens < 4
+        or num_tokens % 4
+        or tokens[0] != "unique_id:"
+        or tokens[2] != "label:"
+        or tokens[4::4].count("child_unique_id:") != num_children
+        or tokens[6::4].count("child_label:") != num_children
+    ):
+        return None
+
+    label = tokens[3]
+    if label[:1] != "(" or label[-2:] != ");":
+        return None
+    fields = label[1:-2].split(",")
+    if len(fields) != 5:
+        return None
+    validator, timestamp, sequence, weight, last_event = fields
+    if (
+        not validator
+        or not (timestamp.isdigit() and sequence.isdigit() and weight.isdigit())
+        or last_event not in ("True", "False")
+    ):
+        return None
+
+    return (
+        tokens[1],
+        validator,
+        int(timestamp),
+        int(sequence),
+        int(weight),
+        last_event == "True",
+        tokens[5::4],
+    )
+
 
-def parse_data(file_path):
-    event_list = []
+def iter_events(file_path, malformed_lines=None, event_ids=None):
+    # lazily yields the events of a graph_*.txt file, one line at a time
+    # malformed lines are appended to malformed_lines as (file_path, line_number, line)
+    # when a list is given, otherwise a warning is emitted for each of them
+    # every uuid is interned once into a dense integer id (event_ids maps uuid -> id),
+    # the engine only ever works with these ids, parents included
+    if event_ids is None:
+        event_ids = {}
 
     with open(file_path, "r") as file:
-        for line in file:
-            unique_id_match = re.search(r"unique_id:\s([a-z0-9-]*)", line)
-            label_match = re.search(
-                r"label:\s\(([\w\s]+),(\d+),(\d+),(\d+),(True|False)\)", line
-            )
-            if not (unique_id_match and label_match):
+        for line_number, line in enumerate(file, 1):
+            if not line.strip():
                 continue
 
-            unique_id = unique_id_match.group(1)
-            validator, timestamp, sequence, weight, last_event = label_match.groups()
+            tokens = tokenize_line(line)
+            if tokens is None:
+                if malformed_lines is not None:
+                    malformed_lines.append((file_path, line_number, line.rstrip("\n")))
+                else:
+                    warnings.warn(
+                        f"{file_path}:{line_number}: "
+                        f"skipping malformed line {line.rstrip()!r}"
+                    )
+                continue
+
+            (
+                unique_id,
+                validator,
+                timestamp,
+                sequence,
+                weight,
+                last_event,
+                child_unique_ids,
+            ) = tokens
 
             event = Event(
                 validator,
-                int(timestamp),
-                int(sequence),
-                int(weight),
+                timestamp,
+                sequence,
+                weight,
                 unique_id,
-                last_event == "True",
+                last_event,
+                event_ids.setdefault(unique_id, len(event_ids)),
             )
+            for child_unique_id in child_unique_ids:
+                event.add_parent(event_ids.setdefault(child_unique_id, len(event_ids)))
 
-            event_list.append(event)
+            yield event
 
-            child_unique_ids = re.findall(r"child_unique_id:\s([a-z0-9-]*)", line)
-            for child_unique_id in child_unique_ids:
-                event.add_parent(child_unique_id)
 
-    return event_list
+def iter_events_from_files(file_paths, malformed_lines=None):
+    # batch mode of iter_events, yields (file_path, event) for every file in turn
+    for file_path in file_paths:
+        for event in iter_events(file_path, malformed_lines):
+            yield file_path, event
+
+
+def parse_data(file_path, malformed_lines=None):
+    return list(iter_events(file_path, malformed_lines))
+
+
+def count_event_ids(events):
+    return 1 + max(max([event.id] + event.parents) for event in events)
+
+
+def load_events(file_path):
+    # .ldag files (see ldag.py) are loaded from their binary columns,
+    # anything else is parsed as a graph_*.txt file
+    if file_path.endswith(".ldag"):
+        from ldag import load_ldag
+
+        return load_ldag(file_path)
+    return parse_data(file_path)
 
 
 def filter_validators_and_weights(events):
@@ -58,28 +148,130 @@ def filter_validators_and_weights(events):
     return validators, validator_weights
 
 
+# the immutable part of a parsed event, shared between every consumer of a parsed
+# DAG (see dag_cache.py), parents is a tuple of event ids
+EventTemplate = namedtuple(
+    "EventTemplate",
+    [
+        "id",
+        "uuid",
+        "validator",
+        "timestamp",
+        "sequence",
+        "weight",
+        "last_event",
+        "parents",
+    ],
+)
+
+
 class Event:
+    # observation tables (highest_observed, lowest_observing, visited) map a validator
+    # to a packed (sequence, event id) pair
+    # an Event is the per-instance overlay of an event: the identity, creator,
+    # timestamp, sequence, weight and parents of the event live in its record, an
+    # EventTemplate shared by every instance that knows the event, so moving an event
+    # to another instance only builds a new overlay (see cleared)
+    __slots__ = (
+        "record",
+        "validator",
+        "timestamp",
+        "sequence",
+        "id",
+        "frame",
+        "root",
+        "atropos",
+        "highest_observed",
+        "lowest_observing",
+        "parents",
+        "visited",
+        "direct_parents",
+        # only used in vector_clocks mode, see vector_clocks.py
+        "highest_sequences",
+        "highest_ids",
+        "lowest_sequences",
+        "lowest_ids",
+    )
+
     def __init__(
-        self, validator, timestamp, sequence, weight, unique_id, last_event=False
+        self,
+        validator,
+        timestamp,
+        sequence,
+        weight,
+        unique_id,
+        last_event=False,
+        event_id=None,
     ):
-        self.validator = validator
-        self.timestamp = timestamp
-        self.original_sequence = sequence
-        self.sequence = sequence
-        self.weight = weight
-        self.uuid = unique_id
+        # the uuid is only kept for I/O and as the canonical tie-breaker, everything
+        # internal is keyed by the dense integer id
+        self.set_record(
+            EventTemplate(
+                event_id,
+                unique_id,
+                validator,
+                timestamp,
+                sequence,
+                weight,
+                last_event,
+                (),
+            )
+        )
+        self.parents = []
+
+    def set_record(self, record):
+        self.record = record
+        # read on every hot path, so kept next to the overlay fields
+        self.validator = record.validator
+        self.timestamp = record.timestamp
+        self.sequence = record.sequence
+        self.id = record.id
         self.frame = None
         self.root = False
         self.atropos = False
         self.highest_observed = {}
         self.lowest_observing = {}
-        self.parents = []
         self.visited = {}
-        self.last_event = last_event
         self.direct_parents = set()
-
-    def add_parent(self, parent_uuid):
-        self.parents.append(parent_uuid)
+        self.highest_sequences = None
+        self.highest_ids = None
+        self.lowest_sequences = None
+        self.lowest_ids = None
+
+    original_sequence = property(lambda self: self.record.sequence)
+    weight = property(lambda self: self.record.weight)
+    uuid = property(lambda self: self.record.uuid)
+    last_event = property(lambda self: self.record.last_event)
+
+    def add_parent(self, parent_id):
+        self.parents.append(parent_id)
+
+    @classmethod
+    def from_template(cls, template):
+        event = cls.__new__(cls)
+        event.set_record(template)
+        event.parents = list(template.parents)
+        return event
+
+    def cleared(self):
+        # a fresh overlay of the same record for another instance, with the parents
+        # this event has been given
+        event = Event.__new__(Event)
+        event.set_record(self.record)
+        event.parents = self.parents
+        return event
+
+    def to_template(self):
+        return EventTemplate(
+            self.id,
+            self.uuid,
+            self.validator,
+            self.timestamp,
+            self.original_sequence,
+            self.weight,
+            self.last_event,
+            tuple(self.parents),
+        )
 
     def __repr__(self):
         return f"\nEvent({self.validator}, {self.timestamp}, {self.sequence}, {self.weight}, \
@@ -121,10 +313,33 @@ class Event:
 
 
 class LachesisMultiInstance:
-    def __init__(self, graph_results=False):
+    def __init__(
+        self,
+        graph_results=False,
+        engine_options=None,
+        workers=0,
+        bootstrap="replay",
+        checkpoint_path=None,
+        checkpoint_interval=100,
+    ):
         self.file_path = None
         self.instances = {}
         self.graph_results = graph_results
+        # keyword arguments passed to every Lachesis instance, the reference included
+        self.engine_options = {} if engine_options is None else engine_options
+        # workers > 0: the instances are processed in that many worker processes
+        self.workers = workers
+        self.instance_pool = None
+        # bootstrap="snapshot": history_state processes every admitted event once, and
+        # a late joining validator starts from a snapshot of it instead of replaying
+        # seen_events
+        self.bootstrap = bootstrap
+        self.history_state = None
+        # checkpoint_path: the run state is checkpointed to that file every
+        # checkpoint_interval timestamps, see checkpoint.py and resume_from
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpointer = None
         self.initial_validators = []
         self.initial_validator_weights = {}
         self.validators = []
@@ -138,52 +353,200 @@ class LachesisMultiInstance:
         self.time = 0
         self.maximum_frame = 1
         self.minimum_frame = 1
-
-    def parse_and_initialize(self):
-        event_list = parse_data(self.file_path)
+        # frame_tracking="tracker": the minimum highest frame over the instances is kept
+        # by a FrameTracker fed by the instances, and the maximum frame as a running
+        # maximum, instance frames never decrease
+        self.frame_tracker = None
+        if self.engine_options.get("frame_tracking", "tracker") == "tracker":
+            from frame_tracker import FrameTracker
+
+            self.frame_tracker = FrameTracker()
+        self.highest_instance_frame = 1
+
+    def parse_events(self):
+        from dag_cache import get_event_templates
+
+        event_list = [
+            Event.from_template(template)
+            for template in get_event_templates(self.file_path)
+        ]
         (
             self.initial_validators,
             self.initial_validator_weights,
         ) = filter_validators_and_weights(event_list)
 
-        uuid_validator_map = {}
+        event_validators = [None] * count_event_ids(event_list)
         for event in event_list:
-            uuid_validator_map[event.uuid] = event.validator
+            event_validators[event.id] = event.validator
 
-        for validator in self.initial_validators:
-            lachesis_instance = Lachesis(validator)
-            lachesis_instance.initialize_validators(
+        return event_list, event_validators
+
+    def parse_and_initialize(self):
+        event_list, event_validators = self.parse_events()
+
+        if self.bootstrap == "snapshot":
+            self.history_state = Lachesis(**self.engine_options)
+            self.history_state.initialize_validators(
                 self.initial_validators, self.initial_validator_weights
             )
+
+        for validator in self.initial_validators:
+            lachesis_instance = self.create_instance(validator)
             self.instances[validator] = lachesis_instance
             self.validators.append(validator)
             self.validator_weights[validator] = self.initial_validator_weights[
                 validator
             ]
+            self.watch_instance(lachesis_instance)
 
-        return event_list, uuid_validator_map
+        return event_list, event_validators
+
+    def create_instance(self, validator, lachesis_instance=None):
+        if lachesis_instance is None:
+            lachesis_instance = Lachesis(validator, **self.engine_options)
+            lachesis_instance.initialize_validators(
+                self.initial_validators, self.initial_validator_weights
+            )
+        if self.instance_pool is not None:
+            return self.instance_pool.add_instance(lachesis_instance)
+        return lachesis_instance
 
     def add_validator(self, event):
         self.validators.append(event.validator)
         self.validator_weights[event.validator] = event.weight
         self.activated_time[event.validator] = self.time
-        lachesis_instance = Lachesis(event.validator)
-        lachesis_instance.initialize_validators(
-            self.initial_validators, self.initial_validator_weights
-        )
+        if self.history_state is not None:
+            # the snapshot already has every (de)activation
+            lachesis_instance = self.create_instance(
+                event.validator, self.history_state.snapshot(event.validator)
+            )
+            self.instances[event.validator] = lachesis_instance
+            self.record("snapshot", event.validator)
+            self.watch_instance(lachesis_instance)
+            return
+
+        lachesis_instance = self.create_instance(event.validator)
         self.instances[event.validator] = lachesis_instance
+        self.record("create", event.validator)
         for v in self.activation_queue:
-            lachesis_instance.activation_queue[v] = self.activation_queue[v]
+            self.call_state(
+                lachesis_instance, "queue_activation", v, *self.activation_queue[v]
+            )
         for v in self.deactivation_queue:
-            lachesis_instance.deactivation_queue[v] = self.deactivation_queue[v]
+            self.call_state(
+                lachesis_instance, "queue_deactivation", v, self.deactivation_queue[v]
+            )
         for v in self.deactivation_time:
-            lachesis_instance.deactivation_time[v] = self.deactivation_time[v]
-
-    def process(self):
-        (
-            event_list,
-            uuid_validator_map,
-        ) = self.parse_and_initialize()
+            self.call_state(
+                lachesis_instance, "set_deactivation_time", v, self.deactivation_time[v]
+            )
+        self.watch_instance(lachesis_instance)
+
+    def record(self, *operation):
+        # the changes of the instances and history_state a checkpoint delta replays,
+        # see checkpoint.py
+        if self.checkpointer is not None:
+            self.checkpointer.record(operation)
+
+    def call_state(self, lachesis_state, name, *args):
+        getattr(lachesis_state, name)(*args)
+        self.record("call", lachesis_state.validator, name, args)
+
+    def known_states(self):
+        # the states that follow the validator (de)activations
+        lachesis_states = [self.instances[v] for v in self.validators]
+        if self.history_state is not None:
+            lachesis_states.append(self.history_state)
+        return lachesis_states
+
+    def watch_instance(self, lachesis_instance):
+        if self.frame_tracker is not None:
+            lachesis_instance.frame_listener = self.update_instance_frames
+            self.update_instance_frames(lachesis_instance)
+
+    def update_instance_frames(self, lachesis_instance):
+        v = lachesis_instance.validator
+        if lachesis_instance.frame > self.highest_instance_frame:
+            self.highest_instance_frame = lachesis_instance.frame
+        # same conditions as the scan over validators in process
+        if v in lachesis_instance.validator_highest_frame:
+            self.frame_tracker.set_frame(
+                v, lachesis_instance.validator_highest_frame[v]
+            )
+        elif v not in self.activation_queue:
+            self.frame_tracker.set_frame(v, 1)
+        else:
+            self.frame_tracker.remove(v)
+
+    def maximum_instance_frame(self):
+        if self.frame_tracker is not None:
+            return self.highest_instance_frame
+        return max([self.instances[v].frame for v in self.validators])
+
+    def minimum_instance_frame(self):
+        if self.frame_tracker is not None:
+            return self.frame_tracker.minimum(self.time)
+
+        frames = []
+        for v in self.validators:
+            if (
+                v not in self.deactivation_time
+                or self.time <= self.deactivation_time[v]
+            ):
+                # one of the initial validators has not appeared, initialize as 1
+                if (
+                    v not in self.instances[v].validator_highest_frame
+                    and v not in self.activation_queue
+                ):
+                    frames.append(1)
+                # all other validators must be present (latent validators must first appear)
+                # to account for their frames
+                elif v in self.instances[v].validator_highest_frame:
+                    frames.append(self.instances[v].validator_highest_frame[v])
+
+        return min(frames) if len(frames) > 0 else 1
+
+    def process(self, resume_path=None):
+        if not self.workers:
+            self.process_timestamps(resume_path)
+            return
+
+        from instance_pool import InstancePool
+
+        self.instance_pool = InstancePool(self.workers)
+        try:
+            self.process_timestamps(resume_path)
+            self.instances = self.instance_pool.collect()
+        finally:
+            self.instance_pool.close()
+            self.instance_pool = None
+
+    def resume_from(self, checkpoint_path):
+        # continues the run checkpointed to checkpoint_path, and keeps checkpointing
+        # to it unless checkpoint_path is set to another file
+        self.process(checkpoint_path)
+
+    def process_timestamps(self, resume_path=None):
+        first_timestamp = None
+        if resume_path is not None:
+            from checkpoint import restore_checkpoint
+
+            (
+                event_list,
+                event_validators,
+                first_timestamp,
+            ) = restore_checkpoint(self, resume_path)
+        else:
+            (
+                event_list,
+                event_validators,
+            ) = self.parse_and_initialize()
+            if self.checkpoint_path is not None:
+                from checkpoint import Checkpointer
+
+                self.checkpointer = Checkpointer(
+                    self, self.file_path, self.checkpoint_path, self.checkpoint_interval
+                )
 
         timestamp_event_dict = {}
 
@@ -194,149 +557,157 @@ class LachesisMultiInstance:
 
         max_timestamp = max(timestamp_event_dict.keys())
         min_timestamp = min(timestamp_event_dict.keys())
+        if first_timestamp is None:
+            first_timestamp = min_timestamp
 
-        for timestamp in range(min_timestamp, max_timestamp + 1):
-            self.time = timestamp
+        for timestamp in range(first_timestamp, max_timestamp + 1):
+            self.start_timestamp(
+                timestamp, timestamp_event_dict.get(timestamp, []), event_validators
+            )
+            self.exchange_events()
+            if self.checkpointer is not None:
+                self.checkpointer.timestamp_processed(timestamp)
 
-            current_timestamp_events = timestamp_event_dict.get(timestamp, [])
+    def start_timestamp(self, timestamp, current_timestamp_events, event_validators):
+        # everything of a timestamp up to the exchange of events between the
+        # instances: validator (de)activation and deferring the new events to their
+        # creators, which queues the requests for their missing parents
+        self.time = timestamp
 
-            max_frame = max([self.instances[v].frame for v in self.validators])
+        max_frame = self.maximum_instance_frame()
 
-            if max_frame > self.maximum_frame:
-                self.maximum_frame = max_frame
+        if max_frame > self.maximum_frame:
+            self.maximum_frame = max_frame
 
-            frames = []
-            for v in self.validators:
-                if (
-                    v not in self.deactivation_time
-                    or self.time <= self.deactivation_time[v]
-                ):
-                    # one of the initial validators has not appeared, initialize as 1
-                    if (
-                        v not in self.instances[v].validator_highest_frame
-                        and v not in self.activation_queue
-                    ):
-                        frames.append(1)
-                    # all other validators must be present (latent validators must first appear)
-                    # to account for their frames
-                    elif v in self.instances[v].validator_highest_frame:
-                        frames.append(self.instances[v].validator_highest_frame[v])
+        min_frame = self.minimum_instance_frame()
 
-            min_frame = min(frames) if len(frames) > 0 else 1
+        if min_frame >= self.minimum_frame:
+            self.minimum_frame = min_frame
 
-            if min_frame >= self.minimum_frame:
-                self.minimum_frame = min_frame
+        timestamp_events = []
 
-            timestamp_events = []
+        for event in current_timestamp_events:
+            if event.last_event:
+                self.deactivation_queue[event.validator] = self.maximum_frame + 2
+                self.deactivation_time[event.validator] = event.timestamp
+                if self.frame_tracker is not None:
+                    self.frame_tracker.set_deactivation_time(
+                        event.validator, event.timestamp
+                    )
+                for lachesis_state in self.known_states():
+                    self.call_state(
+                        lachesis_state,
+                        "queue_deactivation",
+                        event.validator,
+                        self.maximum_frame + 2,
+                    )
+                    self.call_state(
+                        lachesis_state,
+                        "set_deactivation_time",
+                        event.validator,
+                        event.timestamp,
+                    )
 
-            for event in current_timestamp_events:
-                if event.last_event:
-                    self.deactivation_queue[event.validator] = self.maximum_frame + 2
-                    self.deactivation_time[event.validator] = event.timestamp
-                    for validator in self.validators:
-                        self.instances[validator].deactivation_queue[
-                            event.validator
-                        ] = (self.maximum_frame + 2)
-                        self.instances[validator].deactivation_time[
-                            event.validator
-                        ] = event.timestamp
-
-                if self.time > field_of_view:
-                    if (
-                        event.validator not in self.validators
-                        and event.validator not in self.queued_validators
-                    ):
-                        self.queued_validators.add(event.validator)
-                        (f, w) = self.maximum_frame + 1, event.weight
-                        self.activation_queue[event.validator] = (f, w)
-                        for validator in self.validators:
-                            self.instances[validator].activation_queue[
-                                event.validator
-                            ] = (f, w)
-                        continue
+            if self.time > field_of_view:
+                if (
+                    event.validator not in self.validators
+                    and event.validator not in self.queued_validators
+                ):
+                    self.queued_validators.add(event.validator)
+                    (f, w) = self.maximum_frame + 1, event.weight
+                    self.activation_queue[event.validator] = (f, w)
+                    for lachesis_state in self.known_states():
+                        self.call_state(
+                            lachesis_state, "queue_activation", event.validator, f, w
+                        )
+                    continue
 
-                    if (
-                        event.validator not in self.instances
-                        and self.minimum_frame
-                        >= self.activation_queue[event.validator][0]
-                    ):
-                        event.parents = [
-                            p
-                            for p in event.parents
-                            if uuid_validator_map[p] != event.validator
-                        ]
-                        self.add_validator(event)
+                if (
+                    event.validator not in self.instances
+                    and self.minimum_frame >= self.activation_queue[event.validator][0]
+                ):
+                    event.parents = [
+                        p
+                        for p in event.parents
+                        if event_validators[p] != event.validator
+                    ]
+                    self.add_validator(event)
+                    # a snapshot already has the history, a fresh instance replays it
+                    if self.history_state is None:
                         for seen_event in self.seen_events.copy():
-                            cleared_event = Event(
-                                seen_event.validator,
-                                seen_event.timestamp,
-                                seen_event.original_sequence,
-                                seen_event.weight,
-                                seen_event.uuid,
-                                seen_event.last_event,
-                            )
-                            cleared_event.parents = seen_event.parents
                             self.instances[event.validator].process_queue[
-                                seen_event.uuid
-                            ] = cleared_event
+                                seen_event.id
+                            ] = seen_event.cleared()
 
-                    if (
-                        event.validator not in self.instances
-                        and self.minimum_frame
-                        < self.activation_queue[event.validator][0]
-                    ):
-                        continue
-
-                event.parents = [
-                    p
-                    for p in event.parents
-                    if uuid_validator_map[p] in self.instances
-                    and (
-                        uuid_validator_map[p] not in self.activation_queue
-                        or self.time > self.activated_time[uuid_validator_map[p]]
-                    )
-                ]
+                if (
+                    event.validator not in self.instances
+                    and self.minimum_frame < self.activation_queue[event.validator][0]
+                ):
+                    continue
 
-                cleared_event = Event(
-                    event.validator,
-                    event.timestamp,
-                    event.original_sequence,
-                    event.weight,
-                    event.uuid,
-                    event.last_event,
+            event.parents = [
+                p
+                for p in event.parents
+                if event_validators[p] in self.instances
+                and (
+                    event_validators[p] not in self.activation_queue
+                    or self.time > self.activated_time[event_validators[p]]
                 )
-                cleared_event.parents = event.parents
-                timestamp_events.append(cleared_event)
+            ]
+
+            timestamp_events.append(event.cleared())
 
-                instance = self.instances[event.validator]
-                instance.defer_event(event, self.instances, uuid_validator_map)
+            instance = self.instances[event.validator]
+            instance.defer_event(event, self.instances, event_validators)
 
+        self.seen_events.extend(timestamp_events)
+        if self.history_state is not None and timestamp_events:
+            history_events = [event.cleared() for event in timestamp_events]
+            self.record("process", None, history_events)
+            self.history_state.process_events(history_events)
+
+    def exchange_events(self):
+        for instance in self.instances.values():
+            instance.process_request_queue(self.instances)
+
+        if self.checkpointer is not None:
             for instance in self.instances.values():
-                instance.process_request_queue(self.instances)
+                if instance.process_queue:
+                    self.record(
+                        "process",
+                        instance.validator,
+                        list(instance.process_queue.values()),
+                    )
 
+        if self.instance_pool is not None:
+            self.instance_pool.process_deferred_events()
+        else:
             for instance in self.instances.values():
                 instance.process_deferred_events()
 
-            self.seen_events.extend(timestamp_events)
-
     def run_lachesis_multiinstance(
-        self, input_filename, output_folder, graph_results=False
+        self,
+        input_filename,
+        output_folder,
+        graph_results=False,
+        render_queue=None,
+        graph_format="pdf",
     ):
         self.file_path = input_filename
         self.graph_results = graph_results
         self.process()
 
-        reference = Lachesis()
-        reference.run_lachesis(
-            input_filename, "./result.pdf", graph_results=graph_results
-        )
+        # the reference only checks the instances, its graph is the one of run_lachesis
+        # and is not drawn again
+        reference = Lachesis(**self.engine_options)
+        reference.run_lachesis(input_filename, None)
 
         if self.graph_results:
             for validator, instance in self.instances.items():
                 output_filename = os.path.join(
-                    output_folder, f"validator_{validator}_result.pdf"
+                    output_folder, f"validator_{validator}_result.{graph_format}"
                 )
-                instance.graph_results(output_filename)
+                instance.graph_results(output_filename, render_queue)
 
         for instance in self.instances.values():
             assert (
@@ -379,7 +750,19 @@ class LachesisMultiInstance:
 
 
 class Lachesis:
-    def __init__(self, validator=None):
+    def __init__(
+        self,
+        validator=None,
+        vector_clocks=False,
+        forkless_cause_cache=False,
+        fork_detection="frontier",
+        lowest_observing_propagation="bfs",
+        stake_ledger=True,
+        election="pending",
+        vote_backend="dict",
+        frame_tracking="tracker",
+        sync="walk",
+    ):
         self.validator = validator
         self.validators = []
         self.validator_weights = {}
@@ -390,55 +773,268 @@ class Lachesis:
         self.root_set_validators = {}
         self.root_set_events = {}
         self.observed_sequences = {}
+        # fork_detection="frontier": observing validator -> creator ->
+        # {sequence: event id}
+        self.observed_frontier = {}
+        self.fork_detection = fork_detection
+        # lowest_observing_propagation="bounded": creator -> its events sorted by
+        # (sequence, id), observing validator -> creator -> [length of the prefix of
+        # those events it already observes, sequence below which every event of the
+        # creator is in that prefix], and observing validator -> timestamp of its
+        # latest event, the latest any of its lowest_observing entries can have
+        self.creator_events = {}
+        self.lowest_observing_watermarks = {}
+        self.lowest_observing_watermark_times = {}
+        self.lowest_observing_propagation = lowest_observing_propagation
+        self.lowest_observing_checks = 0
+        self.lowest_observing_skips = 0
         self.validator_cheater_list = {}
         self.validator_cheater_times = {}
         self.validator_cheater_frames = {}
+        # validator -> bytearray indexed by event id, 1 once the validator has visited
+        # the event. every array is kept visited_capacity long, past every known id
+        # forkless_cause, the election through it and the fork detectors only probe
+        # the array of one validator (the creator of the observing event), nothing
+        # asks whether any of several validators visited an event
         self.validator_visited_events = {}
+        self.visited_capacity = 0
         self.validator_highest_frame = {}
         self.activation_queue = {}
         self.deactivation_queue = {}
         self.deactivation_time = {}
+        # frame_tracking="tracker": minimum highest frame of the validators that still
+        # count, kept up to date instead of scanned every timestamp. frame_listener is
+        # called with this instance when its frame or its own highest frame grows
+        self.frame_tracker = None
+        if frame_tracking == "tracker":
+            from frame_tracker import FrameTracker
+
+            self.frame_tracker = FrameTracker()
+        self.frame_listener = None
         self.deactivated_validators = set()
         self.deactivated_cheaters = set()
         self.cheaters_observed = {}
         self.quorum_cache = {}
-        self.uuid_event_dict = {}
+        self.stake_ledger = None
+        if stake_ledger:
+            from stake_ledger import StakeLedger
+
+            self.stake_ledger = StakeLedger()
+        # events known to this instance, indexed by event id (None for unknown ids)
+        self.event_table = []
         self.suspected_cheaters = set()
         self.confirmed_cheaters = set()
         self.election_votes = {}
+        # election="pending": (frame, position in root_set_events[frame]) of the
+        # roots that still have to vote for a candidate of frame_to_decide, in the
+        # order process_known_roots visits them
+        self.election = election
+        self.pending_roots = SortedSet()
+        self.atropos_voting_calls = 0
+        self.vote_matrices = None
+        if vote_backend == "matrix":
+            from vote_matrix import VoteMatrices
+
+            self.vote_matrices = VoteMatrices(self)
         self.atropos_roots = {}
         self.decided_roots = {}
         self.block = 1
         self.frame_to_decide = 1
         self.request_queue = deque()
         self.process_queue = {}
+        # sync="batched": the requests of a tick are merged per requestor before the
+        # walk, see process_request_batches. the counters are the requests served,
+        # the walks done for them and the events those walks looked at
+        self.sync = sync
+        self.requests_served = 0
+        self.request_walks = 0
+        self.request_walk_steps = 0
         self.maximum_frame = 1
         self.minimum_frame = 1
         self.leaves = set()
+        # forkless_cause_cache=True: memoized forkless_cause results keyed by
+        # (event_a id, event_b id), indexed by the creator of event_a and by event_b for
+        # invalidation; off by default, pairs are rarely asked twice and the misses
+        # cost more than the hits save
+        self.forkless_cause_cache = {} if forkless_cause_cache else None
+        self.forkless_cause_keys_by_validator = {}
+        self.forkless_cause_keys_by_event = {}
+        self.forkless_cause_keys_by_unvisited = {}
+        self.forkless_cause_hits = 0
+        self.forkless_cause_misses = 0
+        self.vector_clocks = None
+        if vector_clocks:
+            from vector_clocks import VectorClocks
+
+            self.vector_clocks = VectorClocks(self)
 
     def initialize_validators(self, validators=None, validator_weights=None):
         self.validators = [] if validators is None else validators.copy()
         self.validator_weights = (
             {} if validator_weights is None else validator_weights.copy()
         )
+        if self.stake_ledger is not None:
+            self.stake_ledger.reset(
+                self.validators,
+                self.validator_weights,
+                self.deactivated_cheaters | self.deactivated_validators,
+            )
+        if self.frame_tracker is not None:
+            for v in list(self.frame_tracker.frames):
+                self.track_frame(v)
+            for v in self.validators:
+                self.track_frame(v)
 
-    def defer_event(self, event, instances, uuid_validator_map):
-        cleared_event = Event(
-            event.validator,
-            event.timestamp,
-            event.original_sequence,
-            event.weight,
-            event.uuid,
-            event.last_event,
-        )
-        cleared_event.parents = event.parents
-        self.process_queue[event.uuid] = cleared_event
-        for parent_uuid in event.parents:
+    def join_validator(self, validator, weight):
+        self.validator_weights[validator] = weight
+        self.validators.append(validator)
+        if (
+            self.stake_ledger is not None
+            and validator not in self.deactivated_cheaters
+            and validator not in self.deactivated_validators
+        ):
+            self.stake_ledger.join(validator, weight)
+        self.track_frame(validator)
+
+    def track_frame(self, validator):
+        # same conditions as the scan over validators in process_events: validators
+        # that have not appeared count as frame 1 unless they are queued for activation
+        if self.frame_tracker is None:
+            return
+        if validator in self.validators and (
+            validator in self.validator_highest_frame
+            or validator not in self.activation_queue
+        ):
+            self.frame_tracker.set_frame(
+                validator, self.validator_highest_frame.get(validator, 1)
+            )
+        else:
+            self.frame_tracker.remove(validator)
+
+    def update_highest_frame(self, validator, frame):
+        if (
+            validator in self.validator_highest_frame
+            and frame <= self.validator_highest_frame[validator]
+        ):
+            return
+        self.validator_highest_frame[validator] = frame
+        self.track_frame(validator)
+        if self.frame_listener is not None and validator == self.validator:
+            self.frame_listener(self)
+
+    def queue_deactivation(self, validator, frame):
+        self.deactivation_queue[validator] = frame
+
+    def queue_activation(self, validator, frame, weight):
+        self.activation_queue[validator] = (frame, weight)
+        self.track_frame(validator)
+
+    def set_deactivation_time(self, validator, time):
+        self.deactivation_time[validator] = time
+        if self.frame_tracker is not None:
+            self.frame_tracker.set_deactivation_time(validator, time)
+
+    def minimum_validator_frame(self):
+        if self.frame_tracker is not None:
+            return self.frame_tracker.minimum(self.time)
+
+        frames = []
+        for v in self.validators:
+            if (
+                v not in self.deactivation_time
+                or self.time <= self.deactivation_time[v]
+            ):
+                # one of the initial validators has not appeared, initialize as 1
+                if (
+                    v not in self.validator_highest_frame
+                    and v not in self.activation_queue
+                ):
+                    frames.append(1)
+                # all other validators must be present (latent validators must first appear)
+                # to account for their frames
+                elif v in self.validator_highest_frame:
+                    frames.append(self.validator_highest_frame[v])
+
+        return min(frames) if len(frames) > 0 else 1
+
+    def snapshot(self, validator):
+        # a copy of this state for validator, sharing the event records, with nothing
+        # queued and without the frame listener
+        from state_snapshot import copy_state
+
+        frame_listener = self.frame_listener
+        self.frame_listener = None
+        try:
+            lachesis_state = copy_state(self)
+        finally:
+            self.frame_listener = frame_listener
+        lachesis_state.validator = validator
+        lachesis_state.request_queue = deque()
+        lachesis_state.process_queue = {}
+        return lachesis_state
+
+    def get_event(self, event_id):
+        if event_id < len(self.event_table):
+            return self.event_table[event_id]
+        return None
+
+    def reserve_visited_events(self, event_id):
+        if event_id >= self.visited_capacity:
+            self.visited_capacity = (event_id // visited_chunk + 1) * visited_chunk
+            for visited_events in self.validator_visited_events.values():
+                visited_events.extend(
+                    bytes(self.visited_capacity - len(visited_events))
+                )
+
+    def get_visited_events(self, validator):
+        visited_events = self.validator_visited_events.get(validator)
+        if visited_events is None:
+            visited_events = bytearray(self.visited_capacity)
+            self.validator_visited_events[validator] = visited_events
+        return visited_events
+
+    def add_event(self, event):
+        if event.id >= len(self.event_table):
+            self.event_table.extend([None] * (event.id + 1 - len(self.event_table)))
+        self.event_table[event.id] = event
+        if self.lowest_observing_propagation == "bounded":
+            self.add_creator_event(event)
+
+    def add_creator_event(self, event):
+        creator_events = self.creator_events.setdefault(event.validator, [])
+        if not creator_events or event.sequence > creator_events[-1].sequence:
+            # every watermark bound is at most the new sequence already
+            creator_events.append(event)
+            return
+
+        position = len(creator_events)
+        while position > 0 and (
+            creator_events[position - 1].sequence,
+            creator_events[position - 1].id,
+        ) > (event.sequence, event.id):
+            position -= 1
+        creator_events.insert(position, event)
+        # the new event has no lowest observers yet, so the covered prefixes end
+        # before it
+        for watermarks in self.lowest_observing_watermarks.values():
+            watermark = watermarks.get(event.validator)
+            if watermark is not None:
+                watermark[0] = min(watermark[0], position)
+                watermark[1] = self.watermark_bound(creator_events, watermark[0])
+
+    def watermark_bound(self, creator_events, position):
+        if position < len(creator_events):
+            return creator_events[position].sequence
+        return creator_events[-1].sequence + 1
+
+    def defer_event(self, event, instances, event_validators):
+        self.process_queue[event.id] = event.cleared()
+        for parent_id in event.parents:
             if (
-                parent_uuid not in self.process_queue
-                and parent_uuid not in self.uuid_event_dict
+                parent_id not in self.process_queue
+                and self.get_event(parent_id) is None
             ):
-                parent_validator = uuid_validator_map.get(parent_uuid)
+                parent_validator = event_validators[parent_id]
                 if (
                     parent_validator is not None
                     and parent_validator in instances
@@ -446,43 +1042,89 @@ class Lachesis:
                 ):
                     parent_creator_instance = instances[parent_validator]
                     parent_creator_instance.request_queue.append(
-                        (self.validator, parent_uuid)
+                        (self.validator, parent_id)
                     )
 
     def process_request_queue(self, instances):
+        if self.sync == "batched":
+            self.process_request_batches(instances)
+            return
+
         while self.request_queue:
-            requestor_id, requested_uuid = self.request_queue.popleft()
+            requestor_id, requested_id = self.request_queue.popleft()
             requestor_instance = instances[requestor_id]
-            requested_event = self.uuid_event_dict[requested_uuid]
+            requested_event = self.event_table[requested_id]
+            self.requests_served += 1
+            self.request_walks += 1
 
-            for leaf_uuid in self.leaves:
-                stack = [str(leaf_uuid)]
+            for leaf_id in self.leaves:
+                stack = [leaf_id]
 
                 while stack:
-                    current_uuid = stack.pop()
+                    current_id = stack.pop()
+                    self.request_walk_steps += 1
 
                     if (
-                        current_uuid in requestor_instance.uuid_event_dict
-                        or current_uuid in requestor_instance.process_queue
+                        requestor_instance.get_event(current_id) is not None
+                        or current_id in requestor_instance.process_queue
                     ):
                         continue
 
-                    current_event = self.uuid_event_dict[str(current_uuid)]
+                    current_event = self.event_table[current_id]
 
                     if current_event.timestamp <= requested_event.timestamp:
-                        cleared_event = Event(
-                            current_event.validator,
-                            current_event.timestamp,
-                            current_event.original_sequence,
-                            current_event.weight,
-                            current_event.uuid,
-                            current_event.last_event,
-                        )
-                        cleared_event.parents = current_event.parents
-                        requestor_instance.process_queue[current_uuid] = cleared_event
+                        requestor_instance.process_queue[
+                            current_id
+                        ] = current_event.cleared()
 
                     stack.extend(current_event.direct_parents)
 
+    def process_request_batches(self, instances):
+        # every request of a requestor asks for the events it is missing up to the
+        # timestamp of the requested event, so the requests of a tick collapse into
+        # one per requestor with the latest of those timestamps
+        requested_times = {}
+        while self.request_queue:
+            requestor_id, requested_id = self.request_queue.popleft()
+            timestamp = self.event_table[requested_id].timestamp
+            if requested_times.get(requestor_id, timestamp) <= timestamp:
+                requested_times[requestor_id] = timestamp
+            self.requests_served += 1
+
+        for requestor_id, timestamp in requested_times.items():
+            requestor_instance = instances[requestor_id]
+            self.request_walks += 1
+            # walk down every creator chain from its tips, a chain ends at the
+            # requestor's watermark for it: the first event it already has or has
+            # queued, everything below is known to it
+            known_events = requestor_instance.event_table
+            process_queue = requestor_instance.process_queue
+            delta = []
+            walked = set()
+            stack = list(self.leaves)
+            self.request_walk_steps += len(stack)
+            while stack:
+                current_id = stack.pop()
+                if (
+                    current_id in walked
+                    or current_id < len(known_events)
+                    and known_events[current_id] is not None
+                    or current_id in process_queue
+                ):
+                    continue
+                walked.add(current_id)
+
+                current_event = self.event_table[current_id]
+                if current_event.timestamp <= timestamp:
+                    delta.append(current_event)
+                stack.extend(current_event.direct_parents)
+                self.request_walk_steps += len(current_event.direct_parents)
+
+            # parents before children
+            delta.sort(key=lambda event: (event.timestamp, event.sequence))
+            for event in delta:
+                requestor_instance.process_queue[event.id] = event.cleared()
+
     def process_deferred_events(self):
         if self.process_queue:
             self.process_events(list(self.process_queue.values()))
@@ -491,7 +1133,51 @@ class Lachesis:
     def quorum(self, frame):
         if frame in self.quorum_cache:
             return self.quorum_cache[frame]
+        if self.stake_ledger is None:
+            return self.compute_quorum(frame)
+
+        ledger = self.stake_ledger
+        # validators deactivated here only leave the ledger after the cheater check,
+        # which weighs the validators that were active before this frame
+        deactivated = []
+        for v in self.deactivation_queue:
+            if (
+                frame >= self.deactivation_queue[v]
+                and v not in self.deactivated_validators
+            ):
+                self.deactivated_validators.add(v)
+                deactivated.append(v)
+
+        ledger.advance(frame)
+        cheater_quorum = 2 * ledger.active_weight // 3 + 1
+        for s in self.suspected_cheaters:
+            if (
+                s not in self.deactivated_cheaters
+                and ledger.cheater_weight(s, frame) >= cheater_quorum
+            ):
+                self.deactivated_cheaters.add(s)
+                deactivated.append(s)
+
+        for v in deactivated:
+            ledger.leave(v)
 
+        for v in self.activation_queue:
+            (f, w) = self.activation_queue[v]
+            if frame >= f and v not in self.validators:
+                self.join_validator(v, w)
+
+        # validators that are only queued for activation at a later frame
+        weights_total = ledger.active_weight - sum(
+            ledger.active_validators[v]
+            for v, (f, _) in self.activation_queue.items()
+            if frame < f and v in ledger.active_validators
+        )
+
+        self.quorum_cache[frame] = 2 * weights_total // 3 + 1
+        return self.quorum_cache[frame]
+
+    def compute_quorum(self, frame):
+        # reference without the stake ledger, recomputes everything from the tables
         deactivated_cheaters = self.deactivated_cheaters.copy()
         deactivated_validators = self.deactivated_validators.copy()
 
@@ -529,6 +1215,7 @@ class Lachesis:
             if frame >= f and v not in self.validators:
                 self.validator_weights[v] = w
                 self.validators.append(v)
+                self.track_frame(v)
 
         weights_total = sum(
             self.validator_weights[v]
@@ -551,10 +1238,7 @@ class Lachesis:
             else 1
         )
 
-        if event.validator not in self.validator_highest_frame:
-            self.validator_highest_frame[event.validator] = event.frame
-        elif event.frame > self.validator_highest_frame[event.validator]:
-            self.validator_highest_frame[event.validator] = event.frame
+        self.update_highest_frame(event.validator, event.frame)
 
         frame_roots = self.root_set_events.get(event.frame, [])
         if not frame_roots:
@@ -581,6 +1265,8 @@ class Lachesis:
                 event.frame += 1
             if self.frame < event.frame:
                 self.frame = event.frame
+                if self.frame_listener is not None:
+                    self.frame_listener(self)
             if event.frame in self.root_set_events:
                 self.root_set_events[event.frame].append(event)
                 self.root_set_validators[event.frame].append(event.validator)
@@ -588,23 +1274,32 @@ class Lachesis:
                 self.root_set_events[event.frame] = [event]
                 self.root_set_validators[event.frame] = [event.validator]
                 self.quorum(event.frame)
+            if self.election == "pending":
+                self.pending_roots.add(
+                    (event.frame, len(self.root_set_events[event.frame]) - 1)
+                )
+                if event.frame == self.frame_to_decide:
+                    # a new candidate, every later root has to vote for it
+                    self.add_pending_roots(self.frame_to_decide + 1)
 
-        if event.validator not in self.validator_highest_frame:
-            self.validator_highest_frame[event.validator] = event.frame
-        elif event.frame > self.validator_highest_frame[event.validator]:
-            self.validator_highest_frame[event.validator] = event.frame
+        self.update_highest_frame(event.validator, event.frame)
 
     def atropos_voting(self, new_root):
+        self.atropos_voting_calls += 1
         candidates = self.root_set_events[self.frame_to_decide]
 
-        for candidate in candidates:
-            if candidate.uuid in self.decided_roots:
+        # vote_backend="matrix": new_root only records votes of its own frame, so one
+        # tally of the previous frame holds for every candidate
+        tally = None
+
+        for candidate_position, candidate in enumerate(candidates):
+            if candidate.id in self.decided_roots:
                 continue
 
             if self.frame_to_decide not in self.election_votes:
                 self.election_votes[self.frame_to_decide] = {}
 
-            if (new_root.uuid, candidate.uuid) not in self.election_votes[
+            if (new_root.id, candidate.id) not in self.election_votes[
                 self.frame_to_decide
             ]:
                 vote = None
@@ -615,17 +1310,24 @@ class Lachesis:
                         "yes": self.forkless_cause(new_root, candidate),
                     }
                 elif new_root.frame >= self.frame_to_decide + 2:
-                    yes_votes = 0
-                    no_votes = 0
-
-                    for prev_root in self.root_set_events[new_root.frame - 1]:
-                        prev_vote = self.election_votes[self.frame_to_decide].get(
-                            (prev_root.uuid, candidate.uuid), {"yes": False}
-                        )
-                        if prev_vote["yes"]:
-                            yes_votes += self.validator_weights[prev_root.validator]
-                        else:
-                            no_votes += self.validator_weights[prev_root.validator]
+                    if self.vote_matrices is not None:
+                        if tally is None:
+                            tally = self.vote_matrices.tally(new_root.frame - 1)
+                        yes_weights, total_weight = tally
+                        yes_votes = int(yes_weights[candidate_position])
+                        no_votes = total_weight - yes_votes
+                    else:
+                        yes_votes = 0
+                        no_votes = 0
+
+                        for prev_root in self.root_set_events[new_root.frame - 1]:
+                            prev_vote = self.election_votes[self.frame_to_decide].get(
+                                (prev_root.id, candidate.id), {"yes": False}
+                            )
+                            if prev_vote["yes"]:
+                                yes_votes += self.validator_weights[prev_root.validator]
+                            else:
+                                no_votes += self.validator_weights[prev_root.validator]
 
                     vote = {
                         "decided": yes_votes >= self.quorum(self.frame_to_decide)
@@ -635,32 +1337,113 @@ class Lachesis:
 
                 if vote is not None:
                     self.election_votes[self.frame_to_decide][
-                        (new_root.uuid, candidate.uuid)
+                        (new_root.id, candidate.id)
                     ] = vote
+                    if self.vote_matrices is not None and vote["yes"]:
+                        self.vote_matrices.record_yes(new_root, candidate_position)
 
                     if vote["decided"]:
-                        self.decided_roots[candidate.uuid] = vote
+                        self.decided_roots[candidate.id] = vote
 
         for candidate in sorted(
             candidates, key=lambda event: (-event.weight, event.uuid)
         ):
             if (
-                candidate.uuid in self.decided_roots
-                and self.decided_roots[candidate.uuid]["yes"]
+                candidate.id in self.decided_roots
+                and self.decided_roots[candidate.id]["yes"]
             ):
-                self.atropos_roots[self.frame_to_decide] = candidate.uuid
+                self.atropos_roots[self.frame_to_decide] = candidate.id
                 candidate.atropos = True
                 self.frame_to_decide += 1
                 self.block += 1
+                if self.election == "pending":
+                    self.add_pending_roots(self.frame_to_decide + 1)
                 return
 
     def process_known_roots(self):
+        if self.election == "pending":
+            return self.process_pending_roots()
+
         for frame in range(self.frame_to_decide + 1, self.frame):
             frame_roots = self.root_set_events[frame]
             for root in frame_roots:
                 self.atropos_voting(root)
 
+    def add_pending_roots(self, first_frame):
+        for frame in range(first_frame, self.frame + 1):
+            for position in range(len(self.root_set_events.get(frame, ()))):
+                self.pending_roots.add((frame, position))
+
+    def process_pending_roots(self):
+        # same votes in the same order as the re-scan above: a root that has already
+        # voted for every candidate of frame_to_decide would cast no vote and, since
+        # a candidate decided yes ends the election right away, decide nothing
+        last_frame = self.frame
+        index = 0
+        while index < len(self.pending_roots):
+            frame, position = self.pending_roots[index]
+            if frame >= last_frame:
+                break
+            self.pending_roots.remove((frame, position))
+            # roots of decided frames never vote again
+            if frame > self.frame_to_decide:
+                self.atropos_voting(self.root_set_events[frame][position])
+            # a decision marks roots pending again, the ones before this root only
+            # vote on the next call, like in the re-scan
+            index = self.pending_roots.bisect_right((frame, position))
+
     def forkless_cause(self, event_a, event_b):
+        if self.forkless_cause_cache is None:
+            return self.compute_forkless_cause(event_a, event_b)
+
+        key = (event_a.id, event_b.id)
+        result = self.forkless_cause_cache.get(key)
+        if result is not None:
+            self.forkless_cause_hits += 1
+            return result
+
+        self.forkless_cause_misses += 1
+        unvisited = []
+        result = self.compute_forkless_cause(event_a, event_b, unvisited)
+        self.forkless_cause_cache[key] = result
+        self.forkless_cause_keys_by_validator.setdefault(event_a.validator, set()).add(
+            key
+        )
+        self.forkless_cause_keys_by_event.setdefault(event_b.id, set()).add(key)
+        if not result:
+            for event_id in unvisited:
+                self.forkless_cause_keys_by_unvisited.setdefault(
+                    (event_a.validator, event_id), set()
+                ).add(key)
+        return result
+
+    # forkless_cause(a, b) depends on
+    # - the cheater tables of a's creator, which only change when detect_forks finds
+    #   a fork
+    # - the events visited by a's creator, which only ever grow: a cached False can
+    #   turn True once one of the unvisited events it looked at gets visited
+    # - b's lowest_observing entries, rewritten by set_lowest_observing_events
+    # - quorum(b.frame), which never changes once it is in quorum_cache
+    def invalidate_forkless_cause_validator(self, validator):
+        if self.forkless_cause_cache is not None:
+            for key in self.forkless_cause_keys_by_validator.pop(validator, ()):
+                self.forkless_cause_cache.pop(key, None)
+
+    def invalidate_forkless_cause_visited(self, validator, event_id):
+        if self.forkless_cause_keys_by_unvisited:
+            for key in self.forkless_cause_keys_by_unvisited.pop(
+                (validator, event_id), ()
+            ):
+                self.forkless_cause_cache.pop(key, None)
+
+    def invalidate_forkless_cause_event(self, event_id):
+        if self.forkless_cause_cache is not None:
+            for key in self.forkless_cause_keys_by_event.pop(event_id, ()):
+                self.forkless_cause_cache.pop(key, None)
+
+    def compute_forkless_cause(self, event_a, event_b, unvisited=None):
+        # unvisited, if given, collects the observed events that are not yet visited
+        # by the creator of event_a
         if (
             event_b.validator
             in self.validator_cheater_list.get(event_a.validator, set())
@@ -669,32 +1452,34 @@ class Lachesis:
         ):
             return False
 
-        a = {
-            validator: observed["sequence"]
-            for validator, observed in event_a.highest_observed.items()
-        }
+        if self.vector_clocks is not None:
+            return self.vector_clocks.forkless_cause(event_a, event_b, unvisited)
+
         b = event_b.lowest_observing
+        visited_events = self.get_visited_events(event_a.validator)
 
         yes = 0
-        for validator, sequence in a.items():
-            if validator in b and b[validator]["sequence"] <= sequence:
-                uuid_a = event_a.highest_observed[validator]["uuid"]
-                uuid_b = event_b.lowest_observing[validator]["uuid"]
-
-                is_branch = uuid_a in self.validator_visited_events.get(
-                    event_a.validator, set()
-                ) and uuid_b in self.validator_visited_events.get(
-                    event_a.validator, set()
-                )
+        for validator, (sequence, id_a) in event_a.highest_observed.items():
+            if validator in b and b[validator][0] <= sequence:
+                id_b = b[validator][1]
+
+                is_branch = visited_events[id_a] and visited_events[id_b]
+
+                if not is_branch and unvisited is not None:
+                    unvisited.extend(
+                        event_id
+                        for event_id in (id_a, id_b)
+                        if not visited_events[event_id]
+                    )
 
                 no_forks = (
                     event_a.validator not in self.validator_cheater_list
                     or validator not in self.validator_cheater_list[event_a.validator]
                     or (
                         is_branch
-                        and self.uuid_event_dict[uuid_a].timestamp
+                        and self.event_table[id_a].timestamp
                         < self.validator_cheater_times[event_a.validator][validator]
-                        and self.uuid_event_dict[uuid_b].timestamp
+                        and self.event_table[id_b].timestamp
                         < self.validator_cheater_times[event_a.validator][validator]
                     )
                 )
@@ -710,23 +1495,18 @@ class Lachesis:
         if event.validator not in self.validator_cheater_frames:
             self.validator_cheater_frames[event.validator] = {}
 
+        visited_events = self.get_visited_events(event.validator)
         parents = deque(event.parents)
 
         while parents:
             parent_id = parents.popleft()
-            parent = self.uuid_event_dict[parent_id]
+            parent = self.event_table[parent_id]
 
             if event.validator not in parent.visited:
-                parent.visited[event.validator] = {
-                    "uuid": event.uuid,
-                    "sequence": event.sequence,
-                }
-
-                if event.validator not in self.validator_visited_events:
-                    self.validator_visited_events[event.validator] = set(
-                        str(event.uuid)
-                    )
-                self.validator_visited_events[event.validator].add((str(parent.uuid)))
+                parent.visited[event.validator] = (event.sequence, event.id)
+
+                visited_events[parent.id] = 1
+                self.invalidate_forkless_cause_visited(event.validator, parent.id)
 
                 if event.validator not in self.observed_sequences:
                     self.observed_sequences[event.validator] = {}
@@ -737,96 +1517,144 @@ class Lachesis:
                     parent.sequence
                     in self.observed_sequences[event.validator][parent.validator]
                 ):
-                    self.validator_cheater_list[event.validator].add(parent.validator)
-                    if (
-                        parent.validator
-                        not in self.validator_cheater_frames[event.validator]
-                    ):
-                        self.validator_cheater_frames[event.validator][
-                            parent.validator
-                        ] = (
-                            self.validator_highest_frame[event.validator]
-                            if event.validator in self.validator_highest_frame
-                            else 1
-                        )
-                    if event.validator not in self.validator_cheater_times:
-                        self.validator_cheater_times[event.validator] = {}
-                    if (
-                        parent.validator
-                        not in self.validator_cheater_times[event.validator]
-                    ):
-                        self.validator_cheater_times[event.validator][
-                            parent.validator
-                        ] = event.timestamp
-                    self.suspected_cheaters.add(parent.validator)
+                    self.record_fork(event, parent)
                 else:
                     self.observed_sequences[event.validator][parent.validator].add(
                         parent.sequence
                     )
                 parents.extend(parent.parents)
 
+    def detect_forks_frontier(self, event):
+        # same results as the BFS in detect_forks, but every ancestor is only pushed
+        # while it is still unvisited by event.validator, so an event only walks the
+        # delta its parents add to what its creator had already observed
+        # a fork is a second event of a creator at an already observed sequence
+        if event.validator not in self.validator_cheater_list:
+            self.validator_cheater_list[event.validator] = set()
+        if event.validator not in self.validator_cheater_frames:
+            self.validator_cheater_frames[event.validator] = {}
+        if event.validator not in self.observed_frontier:
+            self.observed_frontier[event.validator] = {}
+
+        visited_events = self.get_visited_events(event.validator)
+        frontier = self.observed_frontier[event.validator]
+        visit = (event.sequence, event.id)
+
+        pending = [p for p in event.parents if not visited_events[p]]
+
+        while pending:
+            parent_id = pending.pop()
+            if visited_events[parent_id]:
+                continue
+
+            parent = self.event_table[parent_id]
+            parent.visited[event.validator] = visit
+            visited_events[parent_id] = 1
+            self.invalidate_forkless_cause_visited(event.validator, parent_id)
+
+            if parent.validator not in frontier:
+                frontier[parent.validator] = {}
+            if parent.sequence in frontier[parent.validator]:
+                self.record_fork(event, parent)
+            else:
+                frontier[parent.validator][parent.sequence] = parent_id
+
+            for p in parent.parents:
+                if not visited_events[p]:
+                    pending.append(p)
+
+    def record_fork(self, event, parent):
+        # event's creator has observed two events of parent's creator with the
+        # same sequence
+        self.validator_cheater_list[event.validator].add(parent.validator)
+        self.invalidate_forkless_cause_validator(event.validator)
+        if parent.validator not in self.validator_cheater_frames[event.validator]:
+            self.validator_cheater_frames[event.validator][parent.validator] = (
+                self.validator_highest_frame[event.validator]
+                if event.validator in self.validator_highest_frame
+                else 1
+            )
+            if self.stake_ledger is not None:
+                self.stake_ledger.observe(
+                    event.validator,
+                    parent.validator,
+                    self.validator_cheater_frames[event.validator][parent.validator],
+                )
+        if event.validator not in self.validator_cheater_times:
+            self.validator_cheater_times[event.validator] = {}
+        if parent.validator not in self.validator_cheater_times[event.validator]:
+            self.validator_cheater_times[event.validator][
+                parent.validator
+            ] = event.timestamp
+        self.suspected_cheaters.add(parent.validator)
+
     def set_highest_events_observed(self, event):
+        if self.vector_clocks is not None:
+            return self.vector_clocks.set_highest_events_observed(event)
+
         for parent_id in event.parents:
-            parent = self.uuid_event_dict[parent_id]
+            parent = self.event_table[parent_id]
+            highest_observed = event.highest_observed
 
+            current = highest_observed.get(parent.validator)
             if (
-                parent.validator not in event.highest_observed
-                or parent.sequence
-                > event.highest_observed[parent.validator]["sequence"]
+                current is None
+                or parent.sequence > current[0]
                 or (
-                    parent.validator in event.highest_observed
-                    and parent.sequence
-                    == event.highest_observed[parent.validator]["sequence"]
-                    and parent.uuid < event.highest_observed[parent.validator]["uuid"]
+                    parent.sequence == current[0]
+                    and parent.uuid < self.event_table[current[1]].uuid
                 )
             ):
-                event.highest_observed[parent.validator] = {
-                    "uuid": parent.uuid,
-                    "sequence": parent.sequence,
-                }
+                highest_observed[parent.validator] = (parent.sequence, parent.id)
 
             for validator, observed in parent.highest_observed.items():
+                current = highest_observed.get(validator)
                 if (
-                    validator not in event.highest_observed
-                    or observed["sequence"]
-                    > event.highest_observed[validator]["sequence"]
+                    current is None
+                    or observed[0] > current[0]
                     or (
-                        validator in event.highest_observed
-                        and observed["sequence"]
-                        == event.highest_observed[validator]["sequence"]
-                        and parent.uuid < event.highest_observed[validator]["uuid"]
+                        observed[0] == current[0]
+                        and parent.uuid < self.event_table[current[1]].uuid
                     )
                 ):
-                    event.highest_observed[validator] = observed.copy()
+                    highest_observed[validator] = observed
+
+    def update_lowest_observing(self, parent, event):
+        # makes event the lowest event of its creator observing parent, unless parent
+        # already has an equal or better one, returns whether it did
+        if self.vector_clocks is not None:
+            return self.vector_clocks.update_lowest_observing(parent, event)
+
+        current = parent.lowest_observing.get(event.validator)
+        if current is None or (
+            current[0] > event.sequence
+            and self.event_table[current[1]].timestamp == event.timestamp
+            or (
+                current[0] == event.sequence
+                # event itself is not in event_table yet
+                and current[1] != event.id
+                and event.uuid < self.event_table[current[1]].uuid
+                and self.event_table[current[1]].timestamp == event.timestamp
+            )
+        ):
+            parent.lowest_observing[event.validator] = (event.sequence, event.id)
+            self.invalidate_forkless_cause_event(parent.id)
+            return True
+        return False
 
     def set_lowest_observing_events(self, event):
+        if self.lowest_observing_propagation == "bounded":
+            return self.set_lowest_observing_events_bounded(event)
+
         parents = deque(event.parents)
+        checks = 0
 
         while parents:
             parent_id = parents.popleft()
-            parent = self.uuid_event_dict[parent_id]
-
-            if event.validator not in parent.lowest_observing or (
-                parent.lowest_observing[event.validator]["sequence"] > event.sequence
-                and self.uuid_event_dict[
-                    parent.lowest_observing[event.validator]["uuid"]
-                ].timestamp
-                == event.timestamp
-                or (
-                    parent.lowest_observing[event.validator]["sequence"]
-                    == event.sequence
-                    and event.uuid < parent.lowest_observing[event.validator]["uuid"]
-                    and self.uuid_event_dict[
-                        parent.lowest_observing[event.validator]["uuid"]
-                    ].timestamp
-                    == event.timestamp
-                )
-            ):
-                parent.lowest_observing[event.validator] = {
-                    "uuid": event.uuid,
-                    "sequence": event.sequence,
-                }
+            parent = self.event_table[parent_id]
+            checks += 1
 
+            if self.update_lowest_observing(parent, event):
                 if (
                     event.validator in self.validator_cheater_list
                     and parent.validator in self.validator_cheater_list[event.validator]
@@ -837,6 +1665,90 @@ class Lachesis:
 
                 parents.extend(parent.parents)
 
+        self.lowest_observing_checks += checks
+
+    def set_lowest_observing_events_bounded(self, event):
+        # same results as the BFS in set_lowest_observing_events, which already stops
+        # at ancestors that keep their lowest observer. an ancestor only takes event
+        # if it has no observer of event's creator yet or one from the same timestamp,
+        # so ancestors below the watermark of their creator, all observed from
+        # earlier timestamps, are skipped without looking at their entries
+        watermarks = self.lowest_observing_watermarks.get(event.validator)
+        if watermarks is None:
+            watermarks = self.lowest_observing_watermarks[event.validator] = {}
+            self.lowest_observing_watermark_times[event.validator] = 0
+        covered = (
+            watermarks
+            if self.lowest_observing_watermark_times[event.validator] < event.timestamp
+            else {}
+        )
+
+        event_table = self.event_table
+        update_lowest_observing = self.update_lowest_observing
+        cheaters = self.validator_cheater_list.get(event.validator, ())
+        cheater_times = self.validator_cheater_times.get(event.validator)
+        updated_creators = set()
+        pending = list(event.parents)
+        checks = skips = 0
+
+        while pending:
+            parent = event_table[pending.pop()]
+
+            watermark = covered.get(parent.validator)
+            if watermark is not None and parent.sequence < watermark[1]:
+                skips += 1
+                continue
+
+            checks += 1
+            if not update_lowest_observing(parent, event):
+                continue
+
+            updated_creators.add(parent.validator)
+            if (
+                parent.validator in cheaters
+                and self.time >= cheater_times[parent.validator]
+            ):
+                continue
+
+            pending.extend(parent.parents)
+
+        self.lowest_observing_checks += checks
+        self.lowest_observing_skips += skips
+        for creator in updated_creators:
+            self.advance_lowest_observing_watermark(
+                event.validator, watermarks, creator
+            )
+        self.lowest_observing_watermark_times[event.validator] = max(
+            self.lowest_observing_watermark_times[event.validator], event.timestamp
+        )
+
+    def advance_lowest_observing_watermark(self, validator, watermarks, creator):
+        creator_events = self.creator_events[creator]
+        watermark = watermarks.get(creator)
+        start = position = 0 if watermark is None else watermark[0]
+
+        if self.vector_clocks is None:
+            while (
+                position < len(creator_events)
+                and validator in creator_events[position].lowest_observing
+            ):
+                position += 1
+        else:
+            while (
+                position < len(creator_events)
+                and self.vector_clocks.lowest_observer(
+                    creator_events[position], validator
+                )
+                is not None
+            ):
+                position += 1
+
+        if position > start:
+            watermarks[creator] = [
+                position,
+                self.watermark_bound(creator_events, position),
+            ]
+
     def process_events(self, events):
         timestamp_event_dict = {}
         for event in events:
@@ -849,24 +1761,7 @@ class Lachesis:
 
         for timestamp in range(min_timestamp, max_timestamp + 1):
             self.time = timestamp
-            frames = []
-            for v in self.validators:
-                if (
-                    v not in self.deactivation_time
-                    or self.time <= self.deactivation_time[v]
-                ):
-                    # one of the initial validators has not appeared, initialize as 1
-                    if (
-                        v not in self.validator_highest_frame
-                        and v not in self.activation_queue
-                    ):
-                        frames.append(1)
-                    # all other validators must be present (latent validators must first appear)
-                    # to account for their frames
-                    elif v in self.validator_highest_frame:
-                        frames.append(self.validator_highest_frame[v])
-
-            min_frame = min(frames) if len(frames) > 0 else 1
+            min_frame = self.minimum_validator_frame()
 
             if min_frame > self.minimum_frame:
                 self.minimum_frame = min_frame
@@ -879,43 +1774,41 @@ class Lachesis:
             current_timestamp_events.sort(key=lambda e: (-e.sequence, e.uuid))
 
             for event in current_timestamp_events:
-                for parent in event.parents:
-                    if parent in self.uuid_event_dict:
-                        if (
-                            self.uuid_event_dict[str(parent)].validator
-                            == event.validator
-                        ):
-                            event.direct_parents.add(str(parent))
-                            if parent in self.leaves:
-                                self.leaves.remove(str(parent))
-                self.leaves.add(str(event.uuid))
+                for parent_id in event.parents:
+                    parent = self.get_event(parent_id)
+                    if parent is not None and parent.validator == event.validator:
+                        event.direct_parents.add(parent_id)
+                        self.leaves.discard(parent_id)
+                self.leaves.add(event.id)
 
                 if event.last_event and event.validator not in self.deactivation_queue:
                     self.deactivation_queue[event.validator] = self.maximum_frame + 2
 
                 if event.last_event and event.validator not in self.deactivation_time:
-                    self.deactivation_time[event.validator] = event.timestamp
+                    self.set_deactivation_time(event.validator, event.timestamp)
 
                 if (
                     event.validator not in self.validators
                     and event.timestamp <= field_of_view
                 ):
-                    self.validators.append(event.validator)
-                    self.validator_weights[event.validator] = event.weight
+                    self.join_validator(event.validator, event.weight)
 
                 if (
                     event.validator not in self.validators
                     and self.time > field_of_view
                     and event.validator not in self.activation_queue
                 ):
-                    self.activation_queue[event.validator] = (
-                        self.maximum_frame + 1,
-                        event.weight,
+                    self.queue_activation(
+                        event.validator, self.maximum_frame + 1, event.weight
                     )
                     continue
 
             for event in current_timestamp_events:
-                event.parents = [p for p in event.parents if p in self.uuid_event_dict]
+                # the parent list stays shared with the other instances unless some
+                # parent is unknown here
+                parents = [p for p in event.parents if self.get_event(p) is not None]
+                if len(parents) < len(event.parents):
+                    event.parents = parents
 
                 if (
                     event.validator not in self.validator_highest_frame
@@ -931,139 +1824,152 @@ class Lachesis:
                     event.sequence = 1
                     for p in event.parents:
                         if (
-                            self.uuid_event_dict[p].validator == event.validator
-                            and self.uuid_event_dict[p].original_sequence + 1
+                            self.event_table[p].validator == event.validator
+                            and self.event_table[p].original_sequence + 1
                             == event.original_sequence
                         ):
-                            event.sequence = self.uuid_event_dict[p].sequence + 1
+                            event.sequence = self.event_table[p].sequence + 1
 
-                self.detect_forks(event)
+                self.reserve_visited_events(event.id)
+                if self.vector_clocks is not None:
+                    self.vector_clocks.init_event(event)
+                if self.fork_detection == "frontier":
+                    self.detect_forks_frontier(event)
+                else:
+                    self.detect_forks(event)
                 self.set_highest_events_observed(event)
                 self.set_lowest_observing_events(event)
                 self.set_roots(event)
                 self.events.append(event)
-                self.uuid_event_dict[event.uuid] = event
+                self.add_event(event)
                 self.process_known_roots()
 
         # print(self.leaves)
         # print(len(self.leaves))
 
-    def graph_results(self, output_filename):
-        colors = ["orange", "yellow", "cyan", "blue", "purple"]
-        green = mcolors.to_rgb("green")
-        greens = [
-            tuple(g * 0.7 for g in green),
-            tuple(g * 0.8 for g in green),
-            tuple(g * 0.9 for g in green),
-            green,
-        ]
-        greens = [mcolors.to_hex(g) for g in greens]
-
-        colors_rgb = [mcolors.to_rgb(color) for color in colors]
-
-        darker_colors = []
-        for color in colors_rgb:
-            darker_color = tuple(c * 0.8 for c in color)
-            darker_colors.append(mcolors.to_hex(darker_color))
-
-        timestamp_dag = nx.DiGraph()
+    def render_job(self, output_filename):
+        from render_pool import RenderJob
 
+        nodes = []
+        edges = []
         for event in self.events:
             if event.validator in self.suspected_cheaters:
                 continue
-            validator = event.validator
-            timestamp = event.timestamp
-            sequence = event.sequence
-            frame = event.frame
-            weight = self.validator_weights[validator]
-            root = event.root
-            atropos = event.atropos
-            timestamp_dag.add_node(
-                (validator, timestamp),
-                seq=sequence,
-                frame=frame,
-                weight=weight,
-                root=root,
-                atropos=atropos,
+            nodes.append(
+                (
+                    event.validator,
+                    event.timestamp,
+                    event.sequence,
+                    self.validator_weights[event.validator],
+                    event.frame,
+                    event.root,
+                    event.atropos,
+                )
             )
-            for parent_uuid in event.parents:
-                parent = self.uuid_event_dict[parent_uuid]
+            for parent_id in event.parents:
+                parent = self.event_table[parent_id]
                 if parent.validator in self.suspected_cheaters:
                     continue
-                parent_timestamp = parent.timestamp
-                timestamp_dag.add_edge(
-                    (validator, timestamp),
-                    (parent.validator, parent_timestamp),
+                edges.append(
+                    (
+                        (event.validator, event.timestamp),
+                        (parent.validator, parent.timestamp),
+                    )
                 )
 
-        color_map = {}
-        for node in timestamp_dag:
-            frame = timestamp_dag.nodes[node]["frame"]
-            root = timestamp_dag.nodes[node]["root"]
-            atropos = timestamp_dag.nodes[node]["atropos"]
-            color_index = frame % len(colors)
-            color_map[node] = (
-                greens[frame % len(greens)]
-                if atropos
-                else (darker_colors[color_index] if root else colors[color_index])
-            )
-
-        pos = {}
-        num_nodes = len(self.validator_weights)
-        num_levels = max([event.timestamp for event in self.events])
-
-        figsize = [20, 10]
-        if num_levels >= 15:
-            figsize[0] = figsize[0] * num_levels / 20
-        if num_nodes >= 10:
-            figsize[0] = figsize[0] * num_nodes / 4
-            figsize[1] = figsize[1] * num_nodes / 10
-
-        fig = plt.figure(figsize=(figsize[0], figsize[1]))
-        for i in range(num_nodes + 25):
-            for j in range(num_levels + 25):
-                node = (chr(i + 65), j)
-                pos[node] = (j, i)
-
-        labels = {
-            node: (
-                node[0],
-                node[1],
-                timestamp_dag.nodes[node]["seq"],
-                timestamp_dag.nodes[node]["weight"],
-            )
-            for node in timestamp_dag.nodes
-        }
-
-        nx.draw(
-            timestamp_dag,
-            pos,
-            with_labels=True,
-            labels={
-                val: r"$\mathrm{{{}}}_{{{},{},{}}}$".format(
-                    labels[val][0], labels[val][1], labels[val][2], labels[val][3]
-                )
-                for val in labels
-            },
-            font_family="serif",
-            font_size=9,
-            node_size=1300,
-            node_color=[color_map[node] for node in timestamp_dag.nodes],
-            font_weight="bold",
+        return RenderJob(
+            output_filename,
+            nodes,
+            edges,
+            len(self.validator_weights),
+            max([event.timestamp for event in self.events]),
         )
 
-        fig.savefig(output_filename, format="pdf", dpi=300, bbox_inches="tight")
-        plt.close()
+    def graph_results(self, output_filename, render_queue=None):
+        # drawn here, or put on render_queue (see render_pool.py) to be drawn elsewhere
+        # an output file ending in .svg, .dot or .gv is written without matplotlib
+        job = self.render_job(output_filename)
+        if render_queue is not None:
+            render_queue.put(job)
+            return
+
+        from render_pool import render
+
+        render(job)
+
+    def run_lachesis(
+        self,
+        input_filename,
+        output_filename,
+        graph_results=False,
+        render_queue=None,
+        checkpoint_path=None,
+        checkpoint_interval=100,
+    ):
+        # checkpoint_path: the state is checkpointed to that file every
+        # checkpoint_interval timestamps, see checkpoint.py and resume_from
+        from dag_cache import get_event_templates
 
-    def run_lachesis(self, input_filename, output_filename, graph_results=False):
-        event_list = parse_data(input_filename)
+        event_list = [
+            Event.from_template(template)
+            for template in get_event_templates(input_filename)
+        ]
         validators, validator_weights = filter_validators_and_weights(event_list)
 
         self.initialize_validators(validators, validator_weights)
-        self.process_events(event_list)
+        if checkpoint_path is None:
+            self.process_events(event_list)
+        else:
+            from checkpoint import Checkpointer
+
+            self.process_checkpointed(
+                event_list,
+                Checkpointer(
+                    self, input_filename, checkpoint_path, checkpoint_interval
+                ),
+            )
+
+        if graph_results:
+            self.graph_results(output_filename, render_queue)
+
+    def resume_from(
+        self,
+        checkpoint_path,
+        output_filename=None,
+        graph_results=False,
+        render_queue=None,
+        checkpoint_interval=100,
+    ):
+        # continues the run_lachesis checkpointed to checkpoint_path, and keeps
+        # checkpointing to it
+        from checkpoint import restore_lachesis
+
+        event_list, checkpointer = restore_lachesis(
+            self, checkpoint_path, checkpoint_interval
+        )
+        if event_list:
+            self.process_checkpointed(event_list, checkpointer)
 
         if graph_results:
-            self.graph_results(output_filename)
+            self.graph_results(output_filename, render_queue)
+
+    def process_checkpointed(self, events, checkpointer):
+        # process_events one timestamp at a time, so that a checkpoint falls between
+        # two timestamps. a timestamp without events changes nothing the next one
+        # does not redo
+        timestamp_event_dict = {}
+        for event in events:
+            if event.timestamp not in timestamp_event_dict:
+                timestamp_event_dict[event.timestamp] = []
+            timestamp_event_dict[event.timestamp].append(event)
+
+        for timestamp in range(
+            min(timestamp_event_dict.keys()), max(timestamp_event_dict.keys()) + 1
+        ):
+            if timestamp in timestamp_event_dict:
+                checkpointer.record(("process", None, timestamp_event_dict[timestamp]))
+                self.process_events(timestamp_event_dict[timestamp])
+            checkpointer.timestamp_processed(timestamp)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,245 @@
+import glob
+import mmap
+import os
+import struct
+import sys
+import uuid
+from array import array
+from lachesis import Event, iter_events
+
+# .ldag is a compact, columnar binary form of the graph_*.txt DAG files
+#
+# header: magic, version, flags, num_events, num_validators, num_parents, names_size,
+#         ids_size, the array typecodes of the six integer columns, padded to 4 bytes
+# validator names: utf-8, newline separated, padded to 4 bytes
+# event ids, the unique_id strings of the text file, in one of two forms:
+#   UUID_IDS flag  16 bytes per event, when every id is a uuid in its canonical
+#                  lowercase form, which is read back unchanged
+#   otherwise      uint32 x (num_events + 1) offsets into ids_size bytes of utf-8
+#                  ids, padded to 4 bytes
+# columns, one entry per event in file order (the event id is the row index), each
+# of the narrowest signed or unsigned integer type its values fit, padded to 4 bytes:
+#   validator      index into the validator names
+#   timestamp
+#   sequence
+#   weight
+#   parent_counts  number of parents, the CSR offsets into parents are their sums
+#   parents        num_parents entries, the row of the event minus the row of the
+#                  parent, small since parents come shortly before their children
+# last_event       uint8 per event, padded to 4 bytes
+#
+# the event ids of the loaded events are their row indices, so no interning is needed
+
+LDAG_MAGIC = b"LDAG"
+LDAG_VERSION = 2
+LDAG_HEADER = struct.Struct("<4sHHIIIII6s")
+UUID_IDS = 1
+
+assert [array(typecode).itemsize for typecode in "bhiqBHIQ"] == [1, 2, 4, 8] * 2
+
+
+def padding(size):
+    return -size % 4
+
+
+def column_typecode(values, signed):
+    # the narrowest array typecode that holds every value
+    low = min(values, default=0)
+    high = max(values, default=0)
+    for typecode in "bhiq" if signed else "BHIQ":
+        bits = 8 * array(typecode).itemsize
+        if signed and -(1 << (bits - 1)) <= low and high < 1 << (bits - 1):
+            return typecode
+        if not signed and low >= 0 and high < 1 << bits:
+            return typecode
+    raise ValueError(f"values out of range: {low}..{high}")
+
+
+def is_canonical_uuid(unique_id):
+    try:
+        return str(uuid.UUID(unique_id)) == unique_id
+    except ValueError:
+        return False
+
+
+def convert_to_ldag(input_filename, output_filename=None, malformed_lines=None):
+    if output_filename is None:
+        output_filename = os.path.splitext(input_filename)[0] + ".ldag"
+
+    events = list(iter_events(input_filename, malformed_lines))
+    return write_ldag(events, output_filename)
+
+
+def write_ldag(events, output_filename):
+    # events are written in the given order, their ids are renumbered to row indices
+    rows = {event.id: row for row, event in enumerate(events)}
+
+    validator_ids = {}
+    validators = []
+    parent_counts = []
+    parents = []
+    for row, event in enumerate(events):
+        if event.validator not in validator_ids:
+            validator_ids[event.validator] = len(validator_ids)
+        validators.append(validator_ids[event.validator])
+        # a parent without an event of its own (its line was malformed) is
+        # dropped, as process_events drops it for the text files
+        event_parents = [
+            row - rows[parent_id] for parent_id in event.parents if parent_id in rows
+        ]
+        parent_counts.append(len(event_parents))
+        parents.extend(event_parents)
+
+    columns = []
+    for values, signed in [
+        (validators, False),
+        ([event.timestamp for event in events], True),
+        ([event.sequence for event in events], True),
+        ([event.weight for event in events], True),
+        (parent_counts, False),
+        (parents, True),
+    ]:
+        columns.append(array(column_typecode(values, signed), values))
+
+    flags = 0
+    ids = b""
+    if all(is_canonical_uuid(event.uuid) for event in events):
+        flags |= UUID_IDS
+        id_column = b"".join(uuid.UUID(event.uuid).bytes for event in events)
+    else:
+        encoded_ids = [event.uuid.encode("utf-8") for event in events]
+        id_offsets = array("I", [0])
+        for encoded_id in encoded_ids:
+            id_offsets.append(id_offsets[-1] + len(encoded_id))
+        ids = b"".join(encoded_ids)
+        id_column = id_offsets.tobytes() + ids + bytes(padding(len(ids)))
+
+    names = "\n".join(validator_ids).encode("utf-8")
+    last_events = bytes(event.last_event for event in events)
+
+    with open(output_filename, "wb") as file:
+        file.write(
+            LDAG_HEADER.pack(
+                LDAG_MAGIC,
+                LDAG_VERSION,
+                flags,
+                len(events),
+                len(validator_ids),
+                len(parents),
+                len(names),
+                len(ids),
+                "".join(column.typecode for column in columns).encode("ascii"),
+            )
+        )
+        file.write(bytes(padding(LDAG_HEADER.size)))
+        file.write(names + bytes(padding(len(names))))
+        file.write(id_column)
+        for column in columns:
+            data = column.tobytes()
+            file.write(data + bytes(padding(len(data))))
+        file.write(last_events + bytes(padding(len(last_events))))
+
+    return output_filename
+
+
+def convert_directory(input_dir, malformed_lines=None):
+    output_filenames = []
+    for input_filename in sorted(glob.glob(os.path.join(input_dir, "graph_*.txt"))):
+        output_filenames.append(convert_to_ldag(input_filename, None, malformed_lines))
+    return output_filenames
+
+
+def load_ldag(file_path):
+    with open(file_path, "rb") as file, mmap.mmap(
+        file.fileno(), 0, access=mmap.ACCESS_READ
+    ) as buffer:
+        view = memoryview(buffer)
+        try:
+            return read_events(view, file_path)
+        finally:
+            view.release()
+
+
+def read_events(view, file_path):
+    (
+        magic,
+        version,
+        flags,
+        num_events,
+        num_validators,
+        num_parents,
+        names_size,
+        ids_size,
+        typecodes,
+    ) = LDAG_HEADER.unpack_from(view)
+    if magic != LDAG_MAGIC:
+        raise ValueError(f"{file_path}: not an .ldag file")
+    if version != LDAG_VERSION:
+        raise ValueError(f"{file_path}: unsupported .ldag version {version}")
+
+    offset = LDAG_HEADER.size + padding(LDAG_HEADER.size)
+    names = bytes(view[offset : offset + names_size]).decode("utf-8")
+    validator_names = names.split("\n") if num_validators else []
+    offset += names_size + padding(names_size)
+
+    if flags & UUID_IDS:
+        hex_uuids = view[offset : offset + 16 * num_events].hex()
+        offset += 16 * num_events
+        unique_ids = []
+        for i in range(0, 32 * num_events, 32):
+            h = hex_uuids[i : i + 32]
+            unique_ids.append(f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}")
+    else:
+        size = 4 * (num_events + 1)
+        column = view[offset : offset + size].cast("I")
+        id_offsets = column.tolist()
+        column.release()
+        offset += size
+        ids = bytes(view[offset : offset + ids_size])
+        offset += ids_size + padding(ids_size)
+        unique_ids = [
+            ids[id_offsets[i] : id_offsets[i + 1]].decode("utf-8")
+            for i in range(num_events)
+        ]
+
+    columns = []
+    for typecode, count in zip(
+        typecodes.decode("ascii"), [num_events] * 5 + [num_parents]
+    ):
+        size = array(typecode).itemsize * count
+        column = view[offset : offset + size].cast(typecode)
+        columns.append(column.tolist())
+        column.release()
+        offset += size + padding(size)
+    validators, timestamps, sequences, weights, parent_counts, parents = columns
+    last_events = bytes(view[offset : offset + num_events])
+
+    events = []
+    parent_offset = 0
+    for i in range(num_events):
+        event = Event(
+            validator_names[validators[i]],
+            timestamps[i],
+            sequences[i],
+            weights[i],
+            unique_ids[i],
+            last_events[i] == 1,
+            i,
+        )
+        next_offset = parent_offset + parent_counts[i]
+        event.parents = [i - delta for delta in parents[parent_offset:next_offset]]
+        parent_offset = next_offset
+        events.append(event)
+
+    return events
+
+
+if __name__ == "__main__":
+    input_dirs = sys.argv[1:] or ["../inputs/graphs", "../inputs/cheaters"]
+    for input_dir in input_dirs:
+        text_size = 0
+        ldag_size = 0
+        for output_filename in convert_directory(input_dir):
+            text_size += os.path.getsize(output_filename[: -len(".ldag")] + ".txt")
+            ldag_size += os.path.getsize(output_filename)
+        print(f"{input_dir}: {text_size} bytes of text -> {ldag_size} bytes of .ldag")
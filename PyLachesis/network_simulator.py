@@ -0,0 +1,435 @@
+import asyncio
+import os
+import random
+import selectors
+import sys
+import time
+from lachesis import LachesisMultiInstance
+
+# asyncio simulation of the multi-instance run over a network: every validator
+# instance is a task with an inbound queue, and the requests for missing parents and
+# their responses travel over links with latency, jitter, bandwidth and drop models.
+# a timestamp of the input graph is tick seconds of simulated time, the events of a
+# timestamp are created (start_timestamp) at that time, and each instance processes
+# its deferred events (process_deferred_events) once the responses to all of its
+# requests have arrived. the loop runs on a virtual clock, so the simulation takes as
+# long as its processing, not as long as the simulated time
+# every instance receives and processes in its own task: at a timestamp and when
+# the network has gone quiet it is sent a local message to process what it can
+# with latency, jitter or drops the instances see the events in another order than
+# in the lockstep run, so their frames and atropos are not those of the single
+# instance reference, run_lachesis_multiinstance only checks them against each other
+#
+#   python network_simulator.py [graph file] [latency] [bandwidth] [drop rate]
+
+
+class VirtualClockSelector(selectors.DefaultSelector):
+    # instead of blocking until the next scheduled callback, jumps the clock to it
+    def __init__(self):
+        super().__init__()
+        self.time = 0.0
+
+    def select(self, timeout=None):
+        if timeout is None:
+            raise RuntimeError("simulation stalled, nothing is scheduled")
+        self.time += timeout
+        return super().select(0)
+
+
+class VirtualClockLoop(asyncio.SelectorEventLoop):
+    def __init__(self):
+        super().__init__(VirtualClockSelector())
+
+    def time(self):
+        return self._selector.time
+
+
+class NetworkModel:
+    # every parameter is either a number or a function of (sender, receiver), so
+    # links can be modelled one by one
+    #   latency, jitter: seconds, jitter is drawn uniformly from [0, jitter)
+    #   bandwidth: bytes per second, None for unlimited
+    #   drop_rate: probability a transmission is lost, it is then resent after
+    #   retry_timeout seconds
+    def __init__(
+        self,
+        latency=0.05,
+        jitter=0.0,
+        bandwidth=None,
+        drop_rate=0.0,
+        retry_timeout=0.5,
+        event_size=512,
+        request_size=64,
+        seed=0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.drop_rate = drop_rate
+        self.retry_timeout = retry_timeout
+        self.event_size = event_size
+        self.request_size = request_size
+        self.random = random.Random(seed)
+        self.drops = 0
+
+    def link_value(self, value, sender, receiver):
+        return value(sender, receiver) if callable(value) else value
+
+    def delay(self, sender, receiver):
+        latency = self.link_value(self.latency, sender, receiver)
+        jitter = self.link_value(self.jitter, sender, receiver)
+        return latency + (self.random.random() * jitter if jitter else 0.0)
+
+    def dropped(self, sender, receiver):
+        drop_rate = self.link_value(self.drop_rate, sender, receiver)
+        return drop_rate > 0 and self.random.random() < drop_rate
+
+    def transmission_time(self, size, sender, receiver):
+        bandwidth = self.link_value(self.bandwidth, sender, receiver)
+        return size / bandwidth if bandwidth else 0.0
+
+
+class Link:
+    # one direction between two validators, transmissions are serialized on it
+    def __init__(self, network, sender, receiver):
+        self.network = network
+        self.sender = sender
+        self.receiver = receiver
+        self.busy_until = 0.0
+
+    async def transmit(self, size):
+        loop = asyncio.get_running_loop()
+        network = self.network
+        while True:
+            start = max(loop.time(), self.busy_until)
+            self.busy_until = start + network.transmission_time(
+                size, self.sender, self.receiver
+            )
+            if not network.dropped(self.sender, self.receiver):
+                break
+            network.drops += 1
+            await asyncio.sleep(self.busy_until - loop.time() + network.retry_timeout)
+        await asyncio.sleep(
+            self.busy_until - loop.time() + network.delay(self.sender, self.receiver)
+        )
+
+
+class RequestorInbox:
+    # stands in for the requestor when a server serves its requests, the events
+    # are collected here and only reach the requestor with the response
+    def __init__(self, requestor_instance):
+        self.event_table = requestor_instance.event_table
+        self.get_event = requestor_instance.get_event
+        self.process_queue = {}
+
+
+class NetworkSimulation(LachesisMultiInstance):
+    def __init__(
+        self,
+        network=None,
+        tick=1.0,
+        graph_results=False,
+        engine_options=None,
+        workers=0,
+        checkpoint_path=None,
+    ):
+        # the instances are tasks of one event loop in this process, and the
+        # messages in flight are not part of a checkpoint
+        if workers:
+            raise ValueError("a network simulation runs in one process, workers=0")
+        if checkpoint_path is not None:
+            raise ValueError("a network simulation cannot be checkpointed")
+        super().__init__(graph_results, engine_options)
+        self.network = NetworkModel() if network is None else network
+        self.tick = tick
+        self.links = {}
+        self.inboxes = {}
+        self.tasks = {}
+        # per requestor the event ids of its request batches still waiting for their
+        # response, and per server the requests for events it has not processed
+        # itself yet
+        self.outstanding = {}
+        self.parked_requests = {}
+        self.batches = 0
+        self.stalled_rounds = 0
+        self.in_flight = 0
+        self.idle = None
+        self.messages = 0
+        self.bytes_sent = 0
+        self.events_processed = 0
+        # (validator, frame) -> simulated time the atropos of frame was decided
+        self.decision_times = {}
+        self.finality_latencies = []
+        self.duration = 0.0
+
+    def link(self, sender, receiver):
+        key = (sender, receiver)
+        if key not in self.links:
+            self.links[key] = Link(self.network, sender, receiver)
+        return self.links[key]
+
+    def send(self, sender, receiver, size, message):
+        self.in_flight += 1
+        self.messages += 1
+        self.bytes_sent += size
+        self.idle.clear()
+        asyncio.get_running_loop().create_task(
+            self.deliver(sender, receiver, size, message)
+        )
+
+    async def deliver(self, sender, receiver, size, message):
+        await self.link(sender, receiver).transmit(size)
+        await self.inboxes[receiver].put(message)
+
+    def notify(self, validator, kind):
+        # a local message to the task of validator, it does not cross the network
+        self.in_flight += 1
+        self.idle.clear()
+        self.inboxes[validator].put_nowait((kind, validator, None, None))
+
+    def message_handled(self):
+        self.in_flight -= 1
+        if self.in_flight == 0:
+            self.idle.set()
+
+    def start_instance(self, validator):
+        if validator not in self.inboxes:
+            self.inboxes[validator] = asyncio.Queue()
+            self.outstanding[validator] = {}
+            self.parked_requests[validator] = []
+            self.tasks[validator] = asyncio.get_running_loop().create_task(
+                self.run_instance(validator)
+            )
+
+    async def run_instance(self, validator):
+        inbox = self.inboxes[validator]
+        while True:
+            message = await inbox.get()
+            if message is None:
+                return
+            kind, sender, batch, payload = message
+            if kind == "request":
+                self.serve_requests(validator, sender, batch, payload)
+            elif kind == "timestamp":
+                self.process_instance(validator)
+            elif kind == "stalled":
+                self.process_instance(validator, partial=True)
+            else:
+                instance = self.instances[validator]
+                for event_id, event in payload.items():
+                    if instance.get_event(event_id) is None:
+                        instance.process_queue.setdefault(event_id, event)
+                del self.outstanding[validator][batch]
+                self.process_instance(validator)
+            self.message_handled()
+
+    def serve_requests(self, validator, requestor, batch, requests, partial=False):
+        server_instance = self.instances[validator]
+        known_requests = [
+            request for request in requests if server_instance.get_event(request[1])
+        ]
+        if len(known_requests) < len(requests) and not partial:
+            # the server has not processed some of the requested events itself yet
+            self.parked_requests[validator].append((requestor, batch, requests))
+            return
+        inbox = RequestorInbox(self.instances[requestor])
+        server_instance.request_queue.extend(known_requests)
+        server_instance.process_request_queue({requestor: inbox})
+        self.send(
+            validator,
+            requestor,
+            max(len(inbox.process_queue), 1) * self.network.event_size,
+            ("response", validator, batch, inbox.process_queue),
+        )
+
+    def process_instance(self, validator, partial=False):
+        # queued events wait while one of their parents is still requested, or is
+        # queued and waiting itself
+        instance = self.instances[validator]
+        requested = set()
+        if not partial:
+            for requested_ids in self.outstanding[validator].values():
+                requested.update(requested_ids)
+        waiting = {}
+        while True:
+            waiting_before = len(waiting)
+            for event_id, event in instance.process_queue.items():
+                if event_id not in waiting and any(
+                    p in waiting or (p in requested and instance.get_event(p) is None)
+                    for p in event.parents
+                ):
+                    waiting[event_id] = event
+            if len(waiting) == waiting_before:
+                break
+        ready = {
+            event_id: event
+            for event_id, event in instance.process_queue.items()
+            if event_id not in waiting
+        }
+        if not ready:
+            return
+
+        decided = len(instance.atropos_roots)
+        self.events_processed += len(ready)
+        instance.process_queue = ready
+        instance.process_deferred_events()
+        instance.process_queue = waiting
+
+        parked_requests = self.parked_requests[validator]
+        self.parked_requests[validator] = []
+        for requestor, batch, requests in parked_requests:
+            self.serve_requests(validator, requestor, batch, requests, partial)
+
+        if len(instance.atropos_roots) > decided:
+            now = asyncio.get_running_loop().time()
+            for frame, atropos_id in instance.atropos_roots.items():
+                if (validator, frame) not in self.decision_times:
+                    self.decision_times[(validator, frame)] = now
+                    created = instance.get_event(atropos_id).timestamp * self.tick
+                    self.finality_latencies.append(now - created)
+
+    def exchange_events(self):
+        # the requests queued by start_timestamp go out over the network, one message
+        # per (requestor, server)
+        for validator in self.instances:
+            self.start_instance(validator)
+
+        requests = {}
+        for validator, instance in self.instances.items():
+            while instance.request_queue:
+                request = instance.request_queue.popleft()
+                requests.setdefault((request[0], validator), []).append(request)
+
+        for (requestor, server), server_requests in requests.items():
+            self.batches += 1
+            self.outstanding[requestor][self.batches] = {
+                event_id for _, event_id in server_requests
+            }
+            self.send(
+                requestor,
+                server,
+                len(server_requests) * self.network.request_size,
+                ("request", requestor, self.batches, server_requests),
+            )
+
+        for validator in self.instances:
+            self.notify(validator, "timestamp")
+
+    async def simulate(self):
+        loop = asyncio.get_running_loop()
+        self.idle = asyncio.Event()
+        self.idle.set()
+        (
+            event_list,
+            event_validators,
+        ) = self.parse_and_initialize()
+
+        timestamp_event_dict = {}
+        for event in event_list:
+            timestamp_event_dict.setdefault(event.timestamp, []).append(event)
+
+        start = loop.time()
+        min_timestamp = min(timestamp_event_dict)
+        max_timestamp = max(timestamp_event_dict)
+        for timestamp in range(min_timestamp, max_timestamp + 1):
+            await asyncio.sleep(start + timestamp * self.tick - loop.time())
+            self.start_timestamp(
+                timestamp, timestamp_event_dict.get(timestamp, []), event_validators
+            )
+            self.exchange_events()
+
+        await self.idle.wait()
+        # requests for events their server never got to process are answered with
+        # what it has, and whatever is left is processed with the parents at hand
+        while any(self.parked_requests.values()) or any(
+            instance.process_queue for instance in self.instances.values()
+        ):
+            self.stalled_rounds += 1
+            for validator in self.instances:
+                self.notify(validator, "stalled")
+            await self.idle.wait()
+
+        self.duration = loop.time() - start
+        for inbox in self.inboxes.values():
+            await inbox.put(None)
+        await asyncio.gather(*self.tasks.values())
+
+    def process(self, resume_path=None):
+        if resume_path is not None:
+            raise ValueError("a network simulation cannot resume from a checkpoint")
+        loop = VirtualClockLoop()
+        try:
+            loop.run_until_complete(self.simulate())
+        finally:
+            loop.close()
+
+    def run_lachesis_multiinstance(
+        self,
+        input_filename,
+        output_folder,
+        graph_results=False,
+        render_queue=None,
+        graph_format="pdf",
+    ):
+        self.file_path = input_filename
+        self.graph_results = graph_results
+        self.process()
+
+        if self.graph_results:
+            for validator, instance in self.instances.items():
+                output_filename = os.path.join(
+                    output_folder, f"validator_{validator}_result.{graph_format}"
+                )
+                instance.graph_results(output_filename, render_queue)
+
+        # the instances must agree on the atropos of every frame they have both decided
+        decided = {}
+        for instance in self.instances.values():
+            for frame, atropos_id in instance.atropos_roots.items():
+                atropos = instance.get_event(atropos_id).uuid
+                validator, decided_atropos = decided.setdefault(
+                    frame, (instance.validator, atropos)
+                )
+                assert (
+                    atropos == decided_atropos
+                ), f"Atropos of frame {frame} differs in instances {validator} and {instance.validator}"
+
+    def summary(self):
+        latencies = sorted(self.finality_latencies)
+        return {
+            "simulated_seconds": self.duration,
+            "events_processed": self.events_processed,
+            "throughput": self.events_processed / self.duration if self.duration else 0,
+            "messages": self.messages,
+            "bytes_sent": self.bytes_sent,
+            "drops": self.network.drops,
+            "stalled_rounds": self.stalled_rounds,
+            "decisions": len(latencies),
+            "mean_finality": sum(latencies) / len(latencies) if latencies else None,
+            "median_finality": latencies[len(latencies) // 2] if latencies else None,
+        }
+
+
+if __name__ == "__main__":
+    input_filename = (
+        sys.argv[1] if len(sys.argv) > 1 else "../inputs/graphs/graph_58.txt"
+    )
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    bandwidth = float(sys.argv[3]) if len(sys.argv) > 3 else None
+    drop_rate = float(sys.argv[4]) if len(sys.argv) > 4 else 0.0
+
+    simulation = NetworkSimulation(
+        NetworkModel(
+            latency=latency,
+            jitter=latency / 2,
+            bandwidth=bandwidth,
+            drop_rate=drop_rate,
+        )
+    )
+    simulation.file_path = input_filename
+    start = time.perf_counter()
+    simulation.process()
+    wall_seconds = time.perf_counter() - start
+    for key, value in simulation.summary().items():
+        print(f"{key:>18}: {value}")
+    print(f"{'wall_seconds':>18}: {wall_seconds:.2f}")
@@ -0,0 +1,151 @@
+import os
+import zlib
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+# drawing of the result graphs off the consensus path: Lachesis.render_job turns an
+# instance into a RenderJob, plain data that is cheap to build and to send to another
+# process, and render draws it. Lachesis.graph_results(output_filename,
+# render_queue) puts the job on render_queue instead of drawing it, a RenderPool
+# draws the jobs put on it in its own worker processes
+#
+# nodes are (validator, timestamp, sequence, weight, frame, root, atropos), edges are
+# ((validator, timestamp), (parent validator, parent timestamp))
+RenderJob = namedtuple(
+    "RenderJob", ["output_filename", "nodes", "edges", "num_nodes", "num_levels"]
+)
+
+# node colors by frame, darker for roots, shades of green for atropos, as rgb of the
+# matplotlib named colors orange, yellow, cyan, blue, purple and green
+FRAME_COLORS = [
+    (1.0, 0.6470588235294118, 0.0),
+    (1.0, 1.0, 0.0),
+    (0.0, 1.0, 1.0),
+    (0.0, 0.0, 1.0),
+    (0.5019607843137255, 0.0, 0.5019607843137255),
+]
+GREEN = (0.0, 0.5019607843137255, 0.0)
+
+
+def to_hex(rgb):
+    return "#" + "".join(format(round(c * 255), "02x") for c in rgb)
+
+
+colors = [to_hex(color) for color in FRAME_COLORS]
+darker_colors = [to_hex(tuple(c * 0.8 for c in color)) for color in FRAME_COLORS]
+greens = [
+    to_hex(tuple(g * 0.7 for g in GREEN)),
+    to_hex(tuple(g * 0.8 for g in GREEN)),
+    to_hex(tuple(g * 0.9 for g in GREEN)),
+    to_hex(GREEN),
+]
+
+
+def node_color(frame, root, atropos):
+    color_index = frame % len(colors)
+    return (
+        greens[frame % len(greens)]
+        if atropos
+        else (darker_colors[color_index] if root else colors[color_index])
+    )
+
+
+def render(job):
+    # the format follows the extension of the output file, .svg and .dot are
+    # written directly (see graph_writer.py), anything else is drawn with matplotlib
+    extension = os.path.splitext(job.output_filename)[1].lower()
+    if extension in (".svg", ".dot", ".gv"):
+        from graph_writer import write_graph
+
+        return write_graph(job)
+
+    import networkx as nx
+    import matplotlib.pyplot as plt
+
+    timestamp_dag = nx.DiGraph()
+    labels = {}
+    color_map = {}
+    for validator, timestamp, sequence, weight, frame, root, atropos in job.nodes:
+        node = (validator, timestamp)
+        timestamp_dag.add_node(node)
+        labels[node] = r"$\mathrm{{{}}}_{{{},{},{}}}$".format(
+            validator, timestamp, sequence, weight
+        )
+        color_map[node] = node_color(frame, root, atropos)
+    timestamp_dag.add_edges_from(job.edges)
+
+    # validator A is the bottom row, a timestamp is a column
+    pos = {node: (node[1], ord(node[0]) - 65) for node in timestamp_dag}
+
+    figsize = [20, 10]
+    if job.num_levels >= 15:
+        figsize[0] = figsize[0] * job.num_levels / 20
+    if job.num_nodes >= 10:
+        figsize[0] = figsize[0] * job.num_nodes / 4
+        figsize[1] = figsize[1] * job.num_nodes / 10
+
+    fig = plt.figure(figsize=(figsize[0], figsize[1]))
+    nx.draw(
+        timestamp_dag,
+        pos,
+        with_labels=True,
+        labels=labels,
+        font_family="serif",
+        font_size=9,
+        node_size=1300,
+        node_color=[color_map[node] for node in timestamp_dag.nodes],
+        font_weight="bold",
+    )
+
+    fig.savefig(job.output_filename, format="pdf", dpi=300, bbox_inches="tight")
+    plt.close()
+    return job.output_filename
+
+
+class CollectedJobs(list):
+    # a render queue for a process that does not own the RenderPool, the jobs are
+    # handed to it afterwards
+    put = list.append
+
+
+class RenderPool:
+    # at most max_pending jobs are queued, put waits for the oldest beyond that
+    # sample=n draws the graphs of one output directory in n, the same ones every
+    # run, and skip(job) -> True skips a job
+    def __init__(self, workers=1, max_pending=16, sample=1, skip=None):
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self.max_pending = max_pending
+        self.sample = sample
+        self.skip = skip
+        self.pending = deque()
+        self.submitted = 0
+        self.skipped = 0
+        self.rendered = 0
+        # (output filename, error message) of the jobs that failed
+        self.errors = []
+
+    def sampled(self, job):
+        graph_dir = os.path.dirname(os.path.abspath(job.output_filename))
+        return self.sample <= 1 or zlib.crc32(graph_dir.encode()) % self.sample == 0
+
+    def put(self, job):
+        if (self.skip is not None and self.skip(job)) or not self.sampled(job):
+            self.skipped += 1
+            return False
+        while len(self.pending) >= self.max_pending:
+            self.finish(*self.pending.popleft())
+        self.pending.append((job.output_filename, self.executor.submit(render, job)))
+        self.submitted += 1
+        return True
+
+    def finish(self, output_filename, future):
+        try:
+            future.result()
+            self.rendered += 1
+        except Exception as e:
+            self.errors.append((output_filename, f"{type(e).__name__}: {e}"))
+
+    def close(self):
+        while self.pending:
+            self.finish(*self.pending.popleft())
+        self.executor.shutdown()
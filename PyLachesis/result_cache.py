@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import lachesis
+from dag_cache import file_hash
+
+# results of automate_lachesis kept across runs in a manifest.json in the output
+# directory. an entry is current while its key matches: the hash of the input file,
+# the hash of the engine sources, the hash of the run configuration (engine options,
+# which graphs are drawn) and field_of_view, and its output files still exist. a
+# graph with a current entry is not run again, its stored record is reused
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+KEY_FIELDS = ("input_hash", "engine_hash", "config_hash", "field_of_view")
+ENGINE_MODULES = (
+    "lachesis.py",
+    "vector_clocks.py",
+    "stake_ledger.py",
+    "vote_matrix.py",
+    "frame_tracker.py",
+    "state_snapshot.py",
+    "dag_cache.py",
+    "ldag.py",
+)
+
+
+def engine_hash():
+    # the modules the consensus results depend on, the runner and the renderers
+    # can change without invalidating them
+    engine_dir = os.path.dirname(os.path.abspath(lachesis.__file__))
+    digest = hashlib.sha1()
+    for source_name in ENGINE_MODULES:
+        digest.update(source_name.encode("utf-8"))
+        digest.update(file_hash(os.path.join(engine_dir, source_name)).encode("ascii"))
+    return digest.hexdigest()
+
+
+def config_hash(config):
+    return hashlib.sha1(
+        json.dumps(config, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, output_dir, config):
+        self.manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+        self.key = {
+            "engine_hash": engine_hash(),
+            "config_hash": config_hash(config),
+            "field_of_view": lachesis.field_of_view,
+        }
+        self.entries = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as file:
+                manifest = json.load(file)
+            if manifest.get("version") == MANIFEST_VERSION:
+                self.entries = manifest["entries"]
+        # input file -> hash, computed once per run
+        self.input_hashes = {}
+        self.hits = 0
+        # reason -> number of graphs run again for it
+        self.stale = {}
+
+    def entry_key(self, input_filename):
+        path = os.path.abspath(input_filename)
+        if path not in self.input_hashes:
+            self.input_hashes[path] = file_hash(input_filename)
+        return dict(self.key, input_hash=self.input_hashes[path])
+
+    def staleness(self, input_filename):
+        # None while the stored result is current, why it is not otherwise
+        entry = self.entries.get(os.path.abspath(input_filename))
+        if entry is None:
+            return "new"
+        key = self.entry_key(input_filename)
+        for field in KEY_FIELDS:
+            if entry[field] != key[field]:
+                return field.replace("_hash", "") + " changed"
+        if not all(os.path.exists(output) for output in entry["outputs"]):
+            return "outputs missing"
+        return None
+
+    def lookup(self, input_filename):
+        reason = self.staleness(input_filename)
+        if reason is not None:
+            self.stale[reason] = self.stale.get(reason, 0) + 1
+            return None
+        self.hits += 1
+        return self.entries[os.path.abspath(input_filename)]["record"]
+
+    def store(self, record, outputs):
+        input_filename = record["input_file"]
+        entry = self.entry_key(input_filename)
+        entry.update(record=record, outputs=outputs)
+        self.entries[os.path.abspath(input_filename)] = entry
+
+    def save(self):
+        # entries of inputs that no longer exist are dropped
+        entries = {
+            path: entry for path, entry in self.entries.items() if os.path.exists(path)
+        }
+        temporary_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w") as file:
+            json.dump({"version": MANIFEST_VERSION, "entries": entries}, file)
+        os.replace(temporary_path, self.manifest_path)
+
+    def summary(self):
+        reasons = ", ".join(f"{count} {reason}" for reason, count in self.stale.items())
+        return f"{self.hits} cached" + (f", run again: {reasons}" if reasons else "")
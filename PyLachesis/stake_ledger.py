@@ -0,0 +1,90 @@
+import heapq
+
+# incremental stake accounting behind Lachesis.quorum (Lachesis(stake_ledger=True)):
+# keeps the weight of the active validators, those in Lachesis.validators that are
+# neither deactivated cheaters nor deactivated validators, and for every suspected
+# cheater the active weight of the validators that detected it early enough to count
+# towards deactivating it. both are updated as validators join and leave and as
+# forks are recorded, so a quorum cache miss no longer loops over
+# suspected cheaters x validators or re-sums the weights
+
+
+class StakeLedger:
+    def __init__(self):
+        # validator -> weight
+        self.active_validators = {}
+        self.active_weight = 0
+        # cheater -> heap of (cheater frame, observer) that are not counted yet
+        self.pending_observations = {}
+        # observer -> cheaters it is counted for, cheater -> {observer: cheater frame}
+        self.counted_cheaters = {}
+        self.counted_observers = {}
+        # cheater -> active weight of its counted observers
+        self.observed_weight = {}
+        # every observation with a cheater frame < observed_frame - 1 is counted
+        self.observed_frame = 1
+
+    def reset(self, validators, validator_weights, inactive):
+        self.active_validators = {
+            v: validator_weights[v] for v in validators if v not in inactive
+        }
+        self.active_weight = sum(self.active_validators.values())
+        self.observed_weight = {
+            cheater: sum(self.active_validators.get(v, 0) for v in observers)
+            for cheater, observers in self.counted_observers.items()
+        }
+
+    def join(self, validator, weight):
+        if validator in self.active_validators:
+            return
+        self.active_validators[validator] = weight
+        self.active_weight += weight
+        for cheater in self.counted_cheaters.get(validator, ()):
+            self.observed_weight[cheater] += weight
+
+    def leave(self, validator):
+        weight = self.active_validators.pop(validator, None)
+        if weight is None:
+            return
+        self.active_weight -= weight
+        for cheater in self.counted_cheaters.get(validator, ()):
+            self.observed_weight[cheater] -= weight
+
+    def observe(self, observer, cheater, cheater_frame):
+        # observer has detected cheater while at cheater_frame
+        if cheater_frame < self.observed_frame - 1:
+            self.count(observer, cheater, cheater_frame)
+        else:
+            heapq.heappush(
+                self.pending_observations.setdefault(cheater, []),
+                (cheater_frame, observer),
+            )
+
+    def count(self, observer, cheater, cheater_frame):
+        self.counted_cheaters.setdefault(observer, set()).add(cheater)
+        self.counted_observers.setdefault(cheater, {})[observer] = cheater_frame
+        self.observed_weight[cheater] = self.observed_weight.get(
+            cheater, 0
+        ) + self.active_validators.get(observer, 0)
+
+    def advance(self, frame):
+        if frame <= self.observed_frame:
+            return
+        self.observed_frame = frame
+        for cheater, pending in self.pending_observations.items():
+            while pending and pending[0][0] < frame - 1:
+                cheater_frame, observer = heapq.heappop(pending)
+                self.count(observer, cheater, cheater_frame)
+
+    def cheater_weight(self, cheater, frame):
+        # active weight of the validators that detected cheater before frame - 1
+        if frame >= self.observed_frame:
+            return self.observed_weight.get(cheater, 0)
+        # an earlier frame than the ledger has been advanced to
+        return sum(
+            self.active_validators.get(observer, 0)
+            for observer, cheater_frame in self.counted_observers.get(
+                cheater, {}
+            ).items()
+            if cheater_frame < frame - 1
+        )
@@ -0,0 +1,36 @@
+import io
+import pickle
+from lachesis import EventTemplate
+
+# copies of a Lachesis state (Lachesis.snapshot) made with pickle, several times
+# faster than copy.deepcopy. the event records are shared by every state, so they
+# are passed by reference instead of being copied
+
+
+class RecordPickler(pickle.Pickler):
+    def __init__(self, file, records):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.records = records
+
+    def persistent_id(self, obj):
+        if type(obj) is EventTemplate:
+            self.records.append(obj)
+            return len(self.records) - 1
+        return None
+
+
+class RecordUnpickler(pickle.Unpickler):
+    def __init__(self, file, records):
+        super().__init__(file)
+        self.records = records
+
+    def persistent_load(self, record_id):
+        return self.records[record_id]
+
+
+def copy_state(lachesis_state):
+    file = io.BytesIO()
+    records = []
+    RecordPickler(file, records).dump(lachesis_state)
+    file.seek(0)
+    return RecordUnpickler(file, records).load()
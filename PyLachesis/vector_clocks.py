@@ -0,0 +1,168 @@
+import numpy as np
+
+# optional engine mode (Lachesis(vector_clocks=True)): instead of the
+# highest_observed / lowest_observing dicts, every event carries fixed-width arrays
+# indexed by validator slot, -1 marks a validator that has not been observed
+#   highest_sequences / highest_ids: highest observed event of each validator
+#   lowest_sequences / lowest_ids: lowest event of each validator observing it
+# the dict path in Lachesis stays the reference implementation, see compare_engines.py
+
+NONE = -1
+
+
+class VectorClocks:
+    def __init__(self, lachesis_state, width=8):
+        self.state = lachesis_state
+        self.slots = {}
+        self.slot_validators = []
+        self.width = width
+        self.weights = np.zeros(width, dtype=np.int64)
+        self.weights_key = None
+
+    def slot(self, validator):
+        slot = self.slots.get(validator)
+        if slot is None:
+            slot = len(self.slot_validators)
+            self.slots[validator] = slot
+            self.slot_validators.append(validator)
+            if slot >= self.width:
+                self.grow(2 * self.width)
+        return slot
+
+    def grow(self, width):
+        padding = (0, width - self.width)
+        for event in self.state.event_table:
+            if event is not None:
+                event.highest_sequences = np.pad(
+                    event.highest_sequences, padding, constant_values=NONE
+                )
+                event.highest_ids = np.pad(
+                    event.highest_ids, padding, constant_values=NONE
+                )
+                event.lowest_sequences = np.pad(
+                    event.lowest_sequences, padding, constant_values=NONE
+                )
+                event.lowest_ids = np.pad(
+                    event.lowest_ids, padding, constant_values=NONE
+                )
+        self.width = width
+        self.weights_key = None
+
+    def weight_vector(self):
+        validator_weights = self.state.validator_weights
+        key = (len(validator_weights), len(self.slot_validators), self.width)
+        if key != self.weights_key:
+            self.weights = np.array(
+                [validator_weights.get(v, 0) for v in self.slot_validators]
+                + [0] * (self.width - len(self.slot_validators)),
+                dtype=np.int64,
+            )
+            self.weights_key = key
+        return self.weights
+
+    def init_event(self, event):
+        self.slot(event.validator)
+        event.highest_sequences = np.full(self.width, NONE, dtype=np.int64)
+        event.highest_ids = np.full(self.width, NONE, dtype=np.int64)
+        event.lowest_sequences = np.full(self.width, NONE, dtype=np.int64)
+        event.lowest_ids = np.full(self.width, NONE, dtype=np.int64)
+
+    def set_highest_events_observed(self, event):
+        event_table = self.state.event_table
+        highest_sequences = event.highest_sequences
+        highest_ids = event.highest_ids
+
+        for parent_id in event.parents:
+            parent = event_table[parent_id]
+
+            slot = self.slots[parent.validator]
+            current = highest_sequences[slot]
+            if (
+                current == NONE
+                or parent.sequence > current
+                or (
+                    parent.sequence == current
+                    and parent.uuid < event_table[highest_ids[slot]].uuid
+                )
+            ):
+                highest_sequences[slot] = parent.sequence
+                highest_ids[slot] = parent.id
+
+            # element-wise max, ties on the sequence go to the parent if its uuid is
+            # lower than the uuid of the currently observed event
+            parent_sequences = parent.highest_sequences
+            greater = parent_sequences > highest_sequences
+            for tie in np.flatnonzero(
+                (parent_sequences == highest_sequences) & (parent_sequences != NONE)
+            ):
+                if parent.uuid < event_table[highest_ids[tie]].uuid:
+                    greater[tie] = True
+            highest_sequences[greater] = parent_sequences[greater]
+            highest_ids[greater] = parent.highest_ids[greater]
+
+    def update_lowest_observing(self, parent, event):
+        event_table = self.state.event_table
+        slot = self.slots[event.validator]
+
+        current = parent.lowest_sequences[slot]
+        current_id = parent.lowest_ids[slot]
+        if current == NONE or (
+            current > event.sequence
+            and event_table[current_id].timestamp == event.timestamp
+            or (
+                current == event.sequence
+                # event itself is not in event_table yet
+                and current_id != event.id
+                and event.uuid < event_table[current_id].uuid
+                and event_table[current_id].timestamp == event.timestamp
+            )
+        ):
+            parent.lowest_sequences[slot] = event.sequence
+            parent.lowest_ids[slot] = event.id
+            self.state.invalidate_forkless_cause_event(parent.id)
+            return True
+        return False
+
+    def lowest_observer(self, event, validator):
+        slot = self.slots.get(validator)
+        if slot is None or event.lowest_ids[slot] == NONE:
+            return None
+        return int(event.lowest_ids[slot])
+
+    def forkless_cause(self, event_a, event_b, unvisited=None):
+        # the cheater check on event_b has already been done by Lachesis.forkless_cause
+        state = self.state
+        observed = (event_b.lowest_sequences != NONE) & (
+            event_b.lowest_sequences <= event_a.highest_sequences
+        )
+        slots = np.flatnonzero(observed)
+
+        visited = state.get_visited_events(event_a.validator)
+        cheaters = state.validator_cheater_list.get(event_a.validator)
+        cheater_times = state.validator_cheater_times.get(event_a.validator)
+
+        branches = np.zeros(self.width, dtype=bool)
+        for slot, id_a, id_b in zip(
+            slots.tolist(),
+            event_a.highest_ids[slots].tolist(),
+            event_b.lowest_ids[slots].tolist(),
+        ):
+            if not visited[id_a] or not visited[id_b]:
+                if unvisited is not None:
+                    unvisited.extend(
+                        event_id for event_id in (id_a, id_b) if not visited[event_id]
+                    )
+                continue
+            validator = self.slot_validators[slot]
+            if (
+                cheaters is None
+                or validator not in cheaters
+                or (
+                    state.event_table[id_a].timestamp < cheater_times[validator]
+                    and state.event_table[id_b].timestamp < cheater_times[validator]
+                )
+            ):
+                branches[slot] = True
+
+        yes = int(self.weight_vector() @ branches)
+        return yes >= state.quorum(event_b.frame)
@@ -0,0 +1,69 @@
+import numpy as np
+
+# optional election backend (Lachesis(vote_backend="matrix")): the votes of the
+# election of frame_to_decide are also kept as one boolean matrix per frame, rows
+# are the roots of that frame in root_set_events order, columns the candidates, so
+# the yes weight of every candidate from the roots of a frame is a single
+# weight vector x matrix product instead of a dict lookup per (root, candidate)
+# election_votes stays the record of the votes, the matrices only aggregate them:
+# yes votes are queued per frame and written into the matrix in one go when the
+# frame is tallied
+
+
+class VoteMatrices:
+    def __init__(self, lachesis_state):
+        self.state = lachesis_state
+        self.frame_to_decide = None
+        self.votes = {}
+        self.weights = {}
+        self.positions = {}
+        self.queued_votes = {}
+
+    def start_election(self):
+        if self.frame_to_decide != self.state.frame_to_decide:
+            # the votes of the previous election are not needed anymore
+            self.frame_to_decide = self.state.frame_to_decide
+            self.votes = {}
+            self.weights = {}
+            self.queued_votes = {}
+
+    def matrix(self, frame):
+        state = self.state
+        roots = state.root_set_events.get(frame, [])
+        shape = (len(roots), len(state.root_set_events[self.frame_to_decide]))
+        votes = self.votes.get(frame)
+        if votes is None:
+            votes = np.zeros(shape, dtype=bool)
+        elif votes.shape != shape:
+            votes = np.pad(
+                votes, ((0, shape[0] - votes.shape[0]), (0, shape[1] - votes.shape[1]))
+            )
+        else:
+            return votes
+        self.votes[frame] = votes
+
+        for position in range(len(self.weights.get(frame, ())), len(roots)):
+            self.positions[roots[position].id] = position
+        self.weights[frame] = np.array(
+            [state.validator_weights[root.validator] for root in roots], dtype=np.int64
+        )
+        return votes
+
+    def record_yes(self, root, candidate_position):
+        self.start_election()
+        self.queued_votes.setdefault(root.frame, []).append(
+            (root.id, candidate_position)
+        )
+
+    def tally(self, frame):
+        # yes weight of the roots of frame for every candidate, and their total weight
+        self.start_election()
+        votes = self.matrix(frame)
+        queued_votes = self.queued_votes.pop(frame, None)
+        if queued_votes:
+            root_ids, candidate_positions = zip(*queued_votes)
+            votes[
+                [self.positions[i] for i in root_ids], list(candidate_positions)
+            ] = True
+        weights = self.weights[frame]
+        return weights @ votes, int(weights.sum())
@@ -1,12 +1,8 @@
 import uuid
 import networkx as nx
-import matplotlib.pyplot as plt
 import random
-import matplotlib
 import math
 
-matplotlib.use("Agg")
-
 
 def logistic(L, k, x0, x):
     return L / (1 + math.exp(-k * (x - x0)))
@@ -218,6 +214,109 @@ def createGraph(
                 cheating_parents += 1
                 color_map[(i, j)] = color_map[(deepest_cheater)]
 
+    # print(cheater_nodes)
+
+    # Save graph as text data in format one
+    node_uuids = {}
+
+    with open(txt_filename_format_one, "w") as f:
+        for node in G:
+            if node not in node_uuids:
+                node_uuids[node] = uuid.uuid4()
+            node_uuid = node_uuids[node]
+            f.write(
+                "unique_id: "
+                + str(node_uuid)
+                + " label: ("
+                + str(labels[node][0])
+                + ","
+                + str(labels[node][1])
+                + ","
+                + str(labels[node][2])
+                + ","
+                + str(labels[node][3])
+                + ","
+                + str(labels[node][4])
+                + ")"
+            )
+            f.write(";")
+            for child in G[node]:
+                if child not in node_uuids:
+                    node_uuids[child] = uuid.uuid4()
+                child_uuid = node_uuids[child]
+                f.write(
+                    " child_unique_id: "
+                    + str(child_uuid)
+                    + " child_label: ("
+                    + str(labels[child][0])
+                    + ","
+                    + str(labels[child][1])
+                    + ","
+                    + str(labels[child][2])
+                    + ");"
+                )
+            f.write("\n")
+
+    # # Save graph as text data in format two
+    # with open(txt_filename_format_two, "w") as f:
+    #     for node in G:
+    #         validator = "Event" + labels[node][0]
+    #         epoch = "1"  # affixed to 1 for now
+    #         seq = str(labels[node][2])
+    #         event = validator + seq
+    #         creator = (
+    #             chr(cheater_nodes[node][1] + 65)
+    #             if node in cheater_nodes.keys()
+    #             else chr(node[1] + 65)
+    #         )
+    #         node_information = ";".join([event, epoch, seq, creator])
+    #         children_information = ",".join(
+    #             [
+    #                 "Event" + labels[child][0] + str(labels[child][2])
+    #                 for child in G[node]
+    #             ]
+    #         )
+
+    #         f.write(node_information + ";" + children_information)
+    #         f.write("\n")
+
+    if save_plot or show_graph:
+        draw_graph(
+            G,
+            labels,
+            color_map,
+            num_levels,
+            num_nodes,
+            annotate,
+            cheater_probability,
+            node_present_probability,
+            observing_probability,
+            show_graph,
+            save_plot,
+            graph_filename,
+        )
+
+
+def draw_graph(
+    G,
+    labels,
+    color_map,
+    num_levels,
+    num_nodes,
+    annotate,
+    cheater_probability,
+    node_present_probability,
+    observing_probability,
+    show_graph,
+    save_plot,
+    graph_filename,
+):
+    # matplotlib is only imported when a graph is drawn
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
     # Plot the figure
     figsize = [20, 10]
     # Scale the figure size proportionally to the number of levels and nodes
@@ -286,72 +385,6 @@ def createGraph(
             fontname="monospace",
             transform=fig.transFigure,
         )
-    # print(cheater_nodes)
-
-    # Save graph as text data in format one
-    node_uuids = {}
-
-    with open(txt_filename_format_one, "w") as f:
-        for node in G:
-            if node not in node_uuids:
-                node_uuids[node] = uuid.uuid4()
-            node_uuid = node_uuids[node]
-            f.write(
-                "unique_id: "
-                + str(node_uuid)
-                + " label: ("
-                + str(labels[node][0])
-                + ","
-                + str(labels[node][1])
-                + ","
-                + str(labels[node][2])
-                + ","
-                + str(labels[node][3])
-                + ","
-                + str(labels[node][4])
-                + ")"
-            )
-            f.write(";")
-            for child in G[node]:
-                if child not in node_uuids:
-                    node_uuids[child] = uuid.uuid4()
-                child_uuid = node_uuids[child]
-                f.write(
-                    " child_unique_id: "
-                    + str(child_uuid)
-                    + " child_label: ("
-                    + str(labels[child][0])
-                    + ","
-                    + str(labels[child][1])
-                    + ","
-                    + str(labels[child][2])
-                    + ");"
-                )
-            f.write("\n")
-
-    # # Save graph as text data in format two
-    # with open(txt_filename_format_two, "w") as f:
-    #     for node in G:
-    #         validator = "Event" + labels[node][0]
-    #         epoch = "1"  # affixed to 1 for now
-    #         seq = str(labels[node][2])
-    #         event = validator + seq
-    #         creator = (
-    #             chr(cheater_nodes[node][1] + 65)
-    #             if node in cheater_nodes.keys()
-    #             else chr(node[1] + 65)
-    #         )
-    #         node_information = ";".join([event, epoch, seq, creator])
-    #         children_information = ",".join(
-    #             [
-    #                 "Event" + labels[child][0] + str(labels[child][2])
-    #                 for child in G[node]
-    #             ]
-    #         )
-
-    #         f.write(node_information + ";" + children_information)
-    #         f.write("\n")
-
     # Save plot as a PDF
     if save_plot:
         manager = plt.get_current_fig_manager()